@@ -3,6 +3,34 @@ ASGI config for Lms project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The catalog and classroom views (home, all_courses, course_detail,
+classroom_view) and buy_course are async. Served from here, a worker keeps
+many of them in flight at once instead of one per thread. This is how
+render.yaml and the Procfile run the site:
+
+    gunicorn Lms.asgi:application -k uvicorn_worker.UvicornWorker --workers=4
+
+File downloads (course exports, reports) go through
+app.shortcuts.download_response, which hands Django an async iterator here
+so they still stream instead of being buffered whole.
+
+Compare it with the WSGI setup (``--workers=4 --threads=2``) using
+``manage.py loadtest http://127.0.0.1:8000``. On one CPU, with a local
+SQLite copy seeded with 200 courses and 1000 enrollments, and with
+``--paths /,/all_courses,/course/9/,/all_courses?q=lt --requests 400``:
+
+    clients   WSGI req/s  p99 ms    ASGI req/s  p99 ms
+          1         58.5      89          49.8      47
+          8         58.5     445          43.0     427
+         32         51.4    1598          38.0    2010
+         64         50.7    4483          39.2    2625
+
+Local SQLite never makes a request wait, so there is nothing to overlap and
+the event loop only adds overhead: throughput drops by about a fifth, and
+only the tail at 64 clients improves. The gain comes from requests that
+wait on the network, like remote Postgres and the Stripe call in
+buy_course. Re-run this against the real database before comparing.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +40,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Lms.settings')
+# Read by the settings to turn off per-thread persistent connections
+os.environ.setdefault('DJANGO_ASGI', '1')
 
 application = get_asgi_application()
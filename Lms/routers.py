@@ -0,0 +1,127 @@
+"""Send read-only traffic to replicas while keeping users on their own writes.
+
+Reads only leave the primary inside ``read_from_replica`` (a decorator for
+views, or a context manager for anything else). Once a request writes, the
+rest of it reads from the primary, and ReplicaPinMiddleware sets a cookie
+that keeps that browser on the primary for REPLICA_PIN_SECONDS, long enough
+for the replicas to catch up.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'primary_pin'
+
+# A session missing from a lagging replica would log the user out
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_use_replica = ContextVar('use_replica', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def read_from_replica():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_reads(view_func):
+    """Route the ORM reads of a read-only view to a replica."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            with read_from_replica():
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with read_from_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        if replicas and _use_replica.get() and not (_pinned.get() or _wrote.get()):
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {'default', *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Pin a browser to the primary for a while after it writes.
+
+    Goes after SessionMiddleware so the session save at the end of a
+    request doesn't count as a write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self.start(request)
+        try:
+            return self.pin(request, self.get_response(request))
+        finally:
+            self.finish(tokens)
+
+    async def __acall__(self, request):
+        tokens = self.start(request)
+        try:
+            return self.pin(request, await self.get_response(request))
+        finally:
+            self.finish(tokens)
+
+    def start(self, request):
+        # Fresh state per request: worker threads are reused across requests
+        return _pinned.set(PIN_COOKIE in request.COOKIES), _wrote.set(False)
+
+    def finish(self, tokens):
+        _pinned.reset(tokens[0])
+        _wrote.reset(tokens[1])
+
+    def pin(self, request, response):
+        if _wrote.get() or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
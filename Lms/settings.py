@@ -18,6 +18,12 @@ load_dotenv()
 
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+# payment.gateway.FakeGateway for local runs without Stripe
+PAYMENT_GATEWAY = os.getenv("PAYMENT_GATEWAY", "payment.gateway.StripeGateway")
+# (connect, read) seconds for each Stripe API call
+STRIPE_TIMEOUT = (3.05, float(os.getenv("STRIPE_READ_TIMEOUT", 15)))
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv("STRIPE_MAX_NETWORK_RETRIES", 2))
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,7 +50,9 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'app',
-    'payment'
+    'payment',
+    'tasks',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -52,6 +60,7 @@ MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",   # <- add this
 
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'Lms.routers.ReplicaPinMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -82,13 +91,80 @@ WSGI_APPLICATION = 'Lms.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Configured from DATABASE_URL (see Lms/database.py); without one this is
+# the local SQLite file in WAL mode. Postgres connections come from a
+# psycopg pool unless DATABASE_POOL_MAX_SIZE is 0.
+#
+# Outside the pool, Django keeps one connection per thread open for
+# CONN_MAX_AGE seconds. That suits WSGI's fixed threads, but under ASGI
+# (Lms/asgi.py sets DJANGO_ASGI) sync ORM calls run on executor threads that
+# come and go, and every one would leave a connection open, so there the
+# default is a connection per request.
+
+from Lms.database import parse_database_url
+
+SERVING_ASGI = os.getenv("DJANGO_ASGI") == "1"
+
+DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", 4))
+
+DATABASE_OPTIONS = {
+    'conn_max_age': int(os.getenv("CONN_MAX_AGE", 0 if SERVING_ASGI else 600)),
+    'pool': {
+        'min_size': int(os.getenv("DATABASE_POOL_MIN_SIZE", 1)),
+        'max_size': DATABASE_POOL_MAX_SIZE,
+        'timeout': float(os.getenv("DATABASE_POOL_TIMEOUT", 10)),
+    } if DATABASE_POOL_MAX_SIZE else None,
+}
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': parse_database_url(os.getenv("DATABASE_URL", "sqlite:///db.sqlite3"), BASE_DIR, **DATABASE_OPTIONS),
 }
 
+# Read replicas as comma-separated URLs. Views wrapped in
+# Lms.routers.replica_reads read from them; to try it locally point this at
+# a copy of the SQLite file, e.g. DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+
+DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(",")), 1):
+    DATABASES[f'replica{number}'] = {
+        **parse_database_url(url.strip(), BASE_DIR, **DATABASE_OPTIONS),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['Lms.routers.ReplicaRouter']
+
+# Seconds a browser keeps reading from the primary after it writes
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
+
+
+# Cache
+# Every process that invalidates entries (web workers and the task worker)
+# must share one cache. REDIS_URL does that across services; without it the
+# file-based cache only covers processes on the same box.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('DJANGO_CACHE_DIR', BASE_DIR / '.django_cache'),
+        }
+    }
+
+
+# Course search
+# The backend is picked from the database vendor (SQLite FTS5 or Postgres
+# tsvector); set COURSE_SEARCH_BACKEND to a dotted path to override it.
+
+COURSE_SEARCH_LIMIT = 500
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,84 @@
+import contextvars
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app.models import Course, User
+
+from .routers import PIN_COOKIE, read_from_replica
+
+# A second SQLite file standing in for a replica. It has to be known before
+# the test runner creates the test databases, so it is added at import time.
+REPLICA = 'replica_test'
+if REPLICA not in connections.settings:
+    replica = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(tempfile.gettempdir(), 'lms_replica.sqlite3'),
+        # Tables only: the data migrations belong to the primary
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'lms_test_replica.sqlite3'), 'MIGRATE': False},
+    }
+    connections.settings[REPLICA] = connections.configure_settings(
+        {**settings.DATABASES, REPLICA: replica},
+    )[REPLICA]
+
+
+def in_fresh_context(func):
+    # The router's pins are context variables: start from none, as a request
+    # does, and keep any this sets out of other tests
+    return contextvars.Context().run(func)
+
+
+@override_settings(
+    DATABASE_REPLICAS=[REPLICA],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ReplicaRouterTests(TestCase):
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        # Same ids on both sides, different titles, so a read shows where it went
+        for alias, title in (('default', 'On primary'), (REPLICA, 'On replica')):
+            instructor = User.objects.db_manager(alias).create_user('teacher', password='pw', is_instructor=True)
+            Course.objects.using(alias).create(title=title, instructor=instructor, description='d')
+
+    def test_reads_use_the_replica_only_when_asked(self):
+        def titles():
+            outside = Course.objects.get().title
+            with read_from_replica():
+                inside = Course.objects.get().title
+            return outside, inside
+
+        self.assertEqual(in_fresh_context(titles), ('On primary', 'On replica'))
+
+    def test_a_write_keeps_later_reads_on_the_primary(self):
+        def title_after_write():
+            with read_from_replica():
+                User.objects.create_user('student', password='pw')
+                return Course.objects.get().title
+
+        self.assertEqual(in_fresh_context(title_after_write), 'On primary')
+
+    def test_sessions_and_migrations_stay_on_the_primary(self):
+        def session_alias():
+            with read_from_replica():
+                return router.db_for_read(Session)
+
+        self.assertEqual(in_fresh_context(session_alias), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'app', model_name='course'))
+        self.assertIsNot(router.allow_migrate('default', 'app', model_name='course'), False)
+
+    def test_browser_is_pinned_to_the_primary_after_a_post(self):
+        url = reverse('all_courses')
+        self.assertContains(self.client.get(url), 'On replica')
+        self.assertNotIn(PIN_COOKIE, self.client.cookies)
+
+        self.client.post(reverse('logout'))
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertContains(self.client.get(url), 'On primary')
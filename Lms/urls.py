@@ -33,7 +33,8 @@ handler500 = custom_500
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('app.urls')),
-    path('', include('payment.urls'))
+    path('', include('payment.urls')),
+    path('', include('analytics.urls')),
 
 
 ]
@@ -0,0 +1,34 @@
+from django.contrib import admin
+
+from .models import CourseDailyStats, InstructorDailyStats
+
+
+@admin.register(CourseDailyStats)
+class CourseDailyStatsAdmin(admin.ModelAdmin):
+    # Derived data: fix the sources and run `rollup_analytics --rebuild` instead
+    list_display = ('course', 'date', 'enrollments', 'lesson_completions', 'active_learners', 'revenue')
+    list_select_related = ('course',)
+    date_hierarchy = 'date'
+    search_fields = ('course__title',)
+    ordering = ('-date', 'course')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(InstructorDailyStats)
+class InstructorDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('instructor', 'date', 'active_learners')
+    list_select_related = ('instructor',)
+    date_hierarchy = 'date'
+    search_fields = ('instructor__username',)
+    ordering = ('-date', 'instructor')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
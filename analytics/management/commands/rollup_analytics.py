@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import ROLLUP_GRACE, rollup_stats
+
+
+class Command(BaseCommand):
+    help = "Roll new enrollments, completions and sales into the daily course stats. Run this periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=int(ROLLUP_GRACE.total_seconds()),
+            help="Leave rows younger than this many seconds for the next run.",
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Drop every stat and recompute them from the full history.",
+        )
+
+    def handle(self, *args, **options):
+        written = rollup_stats(grace=timedelta(seconds=options['grace']), rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {written} course-day{'' if written == 1 else 's'}."))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('app', '0017_progress_report_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_enrollment_id', models.BigIntegerField(default=0)),
+                ('last_progress_id', models.BigIntegerField(default=0)),
+                ('last_fulfillment_id', models.BigIntegerField(default=0)),
+                ('rolled_up_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('enrollments', models.PositiveIntegerField(default=0)),
+                ('lesson_completions', models.PositiveIntegerField(default=0)),
+                ('active_learners', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='app.course')),
+            ],
+            options={
+                'verbose_name_plural': 'course daily stats',
+                'constraints': [models.UniqueConstraint(fields=('course', 'date'), name='unique_course_day_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def replay_history(apps, schema_editor):
+    # Send the next rollup back over every source row so the new table is
+    # filled for past days too; the course stats it rewrites come out the same
+    apps.get_model('analytics', 'AnalyticsRollup').objects.update(
+        last_enrollment_id=0, last_progress_id=0, last_fulfillment_id=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstructorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('active_learners', models.PositiveIntegerField(default=0)),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'instructor daily stats',
+                'constraints': [models.UniqueConstraint(fields=('instructor', 'date'), name='unique_instructor_day_stats')],
+            },
+        ),
+        migrations.RunPython(replay_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.db import models
+
+from app.models import Course, User
+
+
+class CourseDailyStats(models.Model):
+    """One course's activity on one day. Written only by analytics.rollups."""
+    course = models.ForeignKey(Course, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    enrollments = models.PositiveIntegerField(default=0)
+    lesson_completions = models.PositiveIntegerField(default=0)
+    # Distinct students who completed at least one lesson that day
+    active_learners = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'course daily stats'
+        constraints = [
+            # Also the index the dashboard's per-course date ranges use
+            models.UniqueConstraint(fields=['course', 'date'], name='unique_course_day_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} on {self.date}"
+
+
+class InstructorDailyStats(models.Model):
+    """Learners across all of an instructor's courses on one day.
+
+    A student active in two courses counts once here, which summing the
+    per-course rows can't give. Written only by analytics.rollups.
+    """
+    instructor = models.ForeignKey(User, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    # Distinct students who completed at least one of the instructor's lessons that day
+    active_learners = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'instructor daily stats'
+        constraints = [
+            models.UniqueConstraint(fields=['instructor', 'date'], name='unique_instructor_day_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.instructor_id} on {self.date}"
+
+
+class AnalyticsRollup(models.Model):
+    # Single row: rows of each source with id <= its watermark are in the stats
+    last_enrollment_id = models.BigIntegerField(default=0)
+    last_progress_id = models.BigIntegerField(default=0)
+    last_fulfillment_id = models.BigIntegerField(default=0)
+    rolled_up_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,202 @@
+"""Daily per-course rollups of enrollments, completions and revenue.
+
+`rollup_stats` is run periodically (`manage.py rollup_analytics`). Like the
+ledger rollup it keeps an id watermark per source table: new rows since the
+last run mark (course, day) pairs dirty, and only those pairs are
+recomputed from scratch, along with the day's learner count for each
+of those courses' instructors. The dashboard then reads at most one row
+per course per day, however much history sits behind it.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from app.models import Course, Enrollment, StudentProgress
+from payment.models import CheckoutFulfillment
+
+from .models import AnalyticsRollup, CourseDailyStats, InstructorDailyStats
+
+# Rows younger than this are left for the next run, so a writer whose
+# transaction committed a lower id late isn't skipped by the watermark.
+ROLLUP_GRACE = timedelta(seconds=30)
+DASHBOARD_DAYS = 30
+
+# (watermark field, model, course lookup, timestamp field)
+SOURCES = (
+    ('last_enrollment_id', Enrollment, 'course', 'enrolled_on'),
+    ('last_progress_id', StudentProgress, 'lesson__module__course', 'completed_at'),
+    ('last_fulfillment_id', CheckoutFulfillment, 'course', 'fulfilled_at'),
+)
+METRICS = ('enrollments', 'lesson_completions', 'active_learners', 'revenue')
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _grouped(queryset, course, **aggregates):
+    return {row.pop(course): row for row in queryset.order_by().values(course).annotate(**aggregates)}
+
+
+def compute_day(day, course_ids):
+    """Fresh CourseDailyStats (unsaved) for ``course_ids`` on ``day``."""
+    start, end = _day_bounds(day)
+    enrollments = _grouped(
+        Enrollment.objects.filter(course__in=course_ids, enrolled_on__gte=start, enrolled_on__lt=end),
+        'course', n=Count('id'),
+    )
+    completions = _grouped(
+        StudentProgress.objects.filter(
+            lesson__module__course__in=course_ids, completed=True, completed_at__gte=start, completed_at__lt=end,
+        ),
+        'lesson__module__course', n=Count('id'), learners=Count('student', distinct=True),
+    )
+    revenue = _grouped(
+        CheckoutFulfillment.objects.filter(course__in=course_ids, fulfilled_at__gte=start, fulfilled_at__lt=end),
+        'course', total=Sum('amount'),
+    )
+    return [
+        CourseDailyStats(
+            course_id=course_id, date=day,
+            enrollments=enrollments.get(course_id, {}).get('n', 0),
+            lesson_completions=completions.get(course_id, {}).get('n', 0),
+            active_learners=completions.get(course_id, {}).get('learners', 0),
+            revenue=revenue.get(course_id, {}).get('total') or Decimal('0.00'),
+        )
+        for course_id in course_ids
+    ]
+
+
+def compute_learners(day, instructor_ids):
+    """Fresh InstructorDailyStats (unsaved) for ``instructor_ids`` on ``day``."""
+    start, end = _day_bounds(day)
+    learners = _grouped(
+        StudentProgress.objects.filter(
+            lesson__module__course__instructor__in=instructor_ids, completed=True,
+            completed_at__gte=start, completed_at__lt=end,
+        ),
+        'lesson__module__course__instructor', n=Count('student', distinct=True),
+    )
+    return [
+        InstructorDailyStats(
+            instructor_id=instructor_id, date=day, active_learners=learners.get(instructor_id, {}).get('n', 0),
+        )
+        for instructor_id in instructor_ids
+    ]
+
+
+def rollup_stats(grace=ROLLUP_GRACE, rebuild=False):
+    """Bring the daily stats up to date. Returns how many course-days were written.
+
+    With ``rebuild`` every stat is dropped and recomputed from the full
+    history, which also picks up deleted rows the watermarks can't see.
+    """
+    cutoff = timezone.now() - grace
+    written = 0
+    with transaction.atomic():
+        rollup, _ = AnalyticsRollup.objects.select_for_update().get_or_create(pk=1)
+        if rebuild:
+            CourseDailyStats.objects.all().delete()
+            InstructorDailyStats.objects.all().delete()
+            for watermark, *_ in SOURCES:
+                setattr(rollup, watermark, 0)
+
+        dirty = defaultdict(set)  # day -> course ids
+        for watermark, model, course, timestamp in SOURCES:
+            pending = model.objects.filter(id__gt=getattr(rollup, watermark))
+            upto = pending.filter(**{f'{timestamp}__lte': cutoff}).aggregate(upto=Max('id'))['upto']
+            if upto is None:
+                continue
+            touched = pending.filter(id__lte=upto).order_by().values_list(course, TruncDate(timestamp)).distinct()
+            for course_id, day in touched:
+                dirty[day].add(course_id)
+            setattr(rollup, watermark, upto)
+
+        for day, course_ids in sorted(dirty.items()):
+            stats = compute_day(day, sorted(course_ids))
+            CourseDailyStats.objects.bulk_create(
+                stats, update_conflicts=True, unique_fields=['course', 'date'], update_fields=METRICS,
+            )
+            written += len(stats)
+            instructor_ids = sorted(set(
+                Course.objects.filter(id__in=course_ids).values_list('instructor', flat=True)
+            ))
+            InstructorDailyStats.objects.bulk_create(
+                compute_learners(day, instructor_ids), update_conflicts=True,
+                unique_fields=['instructor', 'date'], update_fields=['active_learners'],
+            )
+
+        rollup.rolled_up_at = timezone.now()
+        rollup.save()
+    return written
+
+
+@dataclass
+class DayPoint:
+    date: date
+    enrollments: int = 0
+    lesson_completions: int = 0
+    active_learners: int = 0
+    revenue: Decimal = Decimal('0.00')
+    # Bar heights for the charts, as a percentage of the busiest day
+    enrollments_pct: int = 0
+    revenue_pct: int = 0
+
+
+@dataclass
+class InstructorAnalytics:
+    days: list
+    courses: list
+    totals: dict = field(default_factory=dict)
+    rolled_up_at: datetime | None = None
+
+
+def _percent(value, peak):
+    return round(value * 100 / peak) if peak else 0
+
+
+def instructor_analytics(instructor, days=DASHBOARD_DAYS, today=None):
+    """The last ``days`` days of an instructor's stats, read from the rollups only."""
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    stats = CourseDailyStats.objects.filter(course__instructor=instructor, date__gte=start, date__lte=today)
+    sums = {metric: Sum(metric) for metric in ('enrollments', 'lesson_completions', 'revenue')}
+
+    by_day = {row.pop('date'): row for row in stats.order_by().values('date').annotate(**sums)}
+    # Per-course learner counts can't be summed: a student active in two
+    # courses would count twice
+    learners = dict(
+        InstructorDailyStats.objects.filter(instructor=instructor, date__gte=start, date__lte=today)
+        .values_list('date', 'active_learners')
+    )
+    points = [DayPoint(start + timedelta(days=offset)) for offset in range(days)]
+    for point in points:
+        for metric, value in by_day.get(point.date, {}).items():
+            setattr(point, metric, value)
+        point.active_learners = learners.get(point.date, 0)
+    peak_enrollments = max(point.enrollments for point in points)
+    peak_revenue = max(point.revenue for point in points)
+    for point in points:
+        point.enrollments_pct = _percent(point.enrollments, peak_enrollments)
+        point.revenue_pct = _percent(point.revenue, peak_revenue)
+
+    courses = list(
+        stats.order_by().values('course', 'course__title')
+        .annotate(**sums, peak_learners=Max('active_learners'))
+        .order_by('-revenue', '-enrollments', 'course__title')
+    )
+    totals = {
+        'enrollments': sum(point.enrollments for point in points),
+        'lesson_completions': sum(point.lesson_completions for point in points),
+        'revenue': sum((point.revenue for point in points), Decimal('0.00')),
+        'peak_learners': max(point.active_learners for point in points),
+    }
+    rolled_up_at = AnalyticsRollup.objects.filter(pk=1).values_list('rolled_up_at', flat=True).first()
+    return InstructorAnalytics(points, courses, totals, rolled_up_at)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from app.models import Course, Enrollment, Lesson, Module, StudentProgress, User
+from payment.models import CheckoutFulfillment
+
+from .models import AnalyticsRollup, CourseDailyStats
+from .rollups import instructor_analytics, rollup_stats
+
+NOW = timedelta(0)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.course = Course.objects.create(title='Course', instructor=self.instructor, description='d')
+        module = Module.objects.create(course=self.course, title='M', order=1)
+        self.lessons = [Lesson.objects.create(module=module, title=f'L{n}', order=n) for n in (1, 2)]
+        self.today = timezone.localdate()
+
+    def enroll(self, username, completed=(), paid=None):
+        student = User.objects.create_user(username, password='pw')
+        Enrollment.objects.create(student=student, course=self.course)
+        for lesson in completed:
+            StudentProgress.objects.create(student=student, lesson=lesson, completed=True)
+        if paid:
+            CheckoutFulfillment.objects.create(
+                session_id=f'cs_{username}', student=student, course=self.course, amount=Decimal(paid),
+            )
+        return student
+
+    def stats(self):
+        return CourseDailyStats.objects.values_list(
+            'enrollments', 'lesson_completions', 'active_learners', 'revenue',
+        ).get(course=self.course, date=self.today)
+
+    def test_only_new_rows_are_rolled_up_and_days_are_upserted(self):
+        self.enroll('ann', completed=self.lessons, paid='10.00')
+        self.assertEqual(rollup_stats(grace=NOW), 1)
+        self.assertEqual(self.stats(), (1, 2, 1, Decimal('10.00')))
+        self.assertEqual(rollup_stats(grace=NOW), 0)  # nothing past the watermarks
+
+        self.enroll('bob', completed=self.lessons[:1])
+        self.assertEqual(rollup_stats(grace=NOW), 1)
+        self.assertEqual(CourseDailyStats.objects.count(), 1)
+        self.assertEqual(self.stats(), (2, 3, 2, Decimal('10.00')))
+
+    def test_grace_period_leaves_young_rows_for_the_next_run(self):
+        self.enroll('ann')
+        self.assertEqual(rollup_stats(), 0)
+        self.assertEqual(AnalyticsRollup.objects.get().last_enrollment_id, 0)
+        self.assertEqual(rollup_stats(grace=NOW), 1)
+
+    def test_rebuild_picks_up_deleted_rows(self):
+        self.enroll('ann')
+        self.enroll('bob')
+        rollup_stats(grace=NOW)
+        User.objects.get(username='bob').delete()
+        self.assertEqual(rollup_stats(grace=NOW), 0)
+        self.assertEqual(self.stats()[0], 2)
+        rollup_stats(grace=NOW, rebuild=True)
+        self.assertEqual(self.stats()[0], 1)
+
+    def test_dashboard_reads_the_rollups(self):
+        self.enroll('ann', completed=self.lessons, paid='10.00')
+        rollup_stats(grace=NOW)
+        self.enroll('bob', paid='99.00')  # not rolled up yet
+
+        analytics = instructor_analytics(self.instructor, days=7)
+        self.assertEqual(len(analytics.days), 7)
+        self.assertEqual(analytics.days[-1].date, self.today)
+        self.assertEqual(analytics.days[-1].enrollments_pct, 100)
+        self.assertEqual(analytics.totals['enrollments'], 1)
+        self.assertEqual(analytics.totals['revenue'], Decimal('10.00'))
+        [course] = analytics.courses
+        self.assertEqual((course['course__title'], course['lesson_completions']), ('Course', 2))
+
+    def test_a_learner_in_two_courses_counts_once(self):
+        second = Course.objects.create(title='Second', instructor=self.instructor, description='d')
+        module = Module.objects.create(course=second, title='M', order=1)
+        lesson = Lesson.objects.create(module=module, title='L', order=1)
+        student = self.enroll('ann', completed=self.lessons[:1])
+        StudentProgress.objects.create(student=student, lesson=lesson, completed=True)
+        self.enroll('bob', completed=self.lessons[:1])
+        rollup_stats(grace=NOW)
+
+        analytics = instructor_analytics(self.instructor, days=1)
+        self.assertEqual(analytics.days[0].active_learners, 2)
+        self.assertEqual(analytics.totals['peak_learners'], 2)
+        self.assertEqual({course['course__title']: course['peak_learners'] for course in analytics.courses},
+                         {'Course': 2, 'Second': 1})
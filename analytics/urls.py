@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('instructor/analytics/', views.instructor_analytics_view, name='instructor_analytics'),
+]
@@ -0,0 +1,15 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+
+from Lms.routers import replica_reads
+
+from .rollups import instructor_analytics
+
+
+# The rollups lag by design, so a replica serves them just as well
+@login_required
+@replica_reads
+def instructor_analytics_view(request):
+    if not request.user.is_instructor:
+        return redirect('student_dashboard')
+    return render(request, 'instructor/analytics.html', {'analytics': instructor_analytics(request.user)})
@@ -1,7 +1,15 @@
-
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User, Course, Module, Lesson, Quiz, Enrollment, StudentProgress
+from .pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    # For tables that grow with every student: no exact COUNT(*) per page
+    # view, and FK filters are replaced by search and autocomplete.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 # Custom User Admin to show instructor status
 @admin.register(User)
@@ -16,59 +24,81 @@ class CustomUserAdmin(UserAdmin):
     )
 
 
+class ModuleInline(admin.TabularInline):
+    model = Module
+    fields = ('title', 'order', 'available_after_days')
+    ordering = ('order', 'id')
+    show_change_link = True
+    extra = 1
+
+
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ('title', 'instructor', 'is_published')
-    list_filter = ('is_published', 'instructor')
+    list_filter = ('is_published',)
+    list_select_related = ('instructor',)
     search_fields = ('title', 'instructor__username')
+    autocomplete_fields = ('instructor',)
     ordering = ('title',)
+    inlines = [ModuleInline]
 
 
-class ModuleInline(admin.TabularInline):
-    model = Module
+class LessonInline(admin.TabularInline):
+    model = Lesson
+    # notes is an unbounded textarea; it's edited on the lesson's own page
+    fields = ('title', 'order', 'available_after_days', 'video_url')
+    ordering = ('order', 'id')
+    show_change_link = True
     extra = 1
 
 
 @admin.register(Module)
 class ModuleAdmin(admin.ModelAdmin):
     list_display = ('title', 'course', 'order', 'available_after_days')
-    list_filter = ('course',)
-    search_fields = ('title',)
+    list_select_related = ('course',)
+    search_fields = ('title', 'course__title')
+    autocomplete_fields = ('course',)
     ordering = ('course', 'order')
-    inlines = []
-
-
-class LessonInline(admin.TabularInline):
-    model = Lesson
-    extra = 1
+    inlines = [LessonInline]
 
 
 @admin.register(Lesson)
 class LessonAdmin(admin.ModelAdmin):
-    list_display = ('title', 'module', 'order')
-    list_filter = ('module',)
-    search_fields = ('title',)
+    list_display = ('title', 'module', 'course', 'order')
+    list_select_related = ('module__course',)
+    search_fields = ('title', 'module__title', 'module__course__title')
+    autocomplete_fields = ('module',)
     ordering = ('module', 'order')
 
+    @admin.display(ordering='module__course__title')
+    def course(self, lesson):
+        return lesson.module.course
+
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
     list_display = ('lesson', 'question')
-    search_fields = ('question',)
-    list_filter = ('lesson',)
+    list_select_related = ('lesson',)
+    search_fields = ('question', 'lesson__title')
+    autocomplete_fields = ('lesson',)
 
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
-    list_display = ('student', 'course', 'enrolled_on')
-    list_filter = ('course', 'enrolled_on')
+class EnrollmentAdmin(LargeTableAdmin):
+    list_display = ('student', 'course', 'enrolled_on', 'completed_lessons', 'total_lessons')
+    list_filter = ('enrolled_on',)
+    list_select_related = ('student', 'course')
     search_fields = ('student__username', 'course__title')
-    ordering = ('-enrolled_on',)
+    autocomplete_fields = ('student', 'course')
+    # Same order as -enrolled_on, but an index scan on the primary key
+    ordering = ('-id',)
 
 
 @admin.register(StudentProgress)
-class StudentProgressAdmin(admin.ModelAdmin):
-    list_display = ('student', 'lesson', 'completed_at')
-    list_filter = ('completed_at',)
+class StudentProgressAdmin(LargeTableAdmin):
+    list_display = ('student', 'lesson', 'completed', 'completed_at')
+    list_filter = ('completed', 'completed_at')
+    list_select_related = ('student', 'lesson')
     search_fields = ('student__username', 'lesson__title')
-    ordering = ('-completed_at',)
+    autocomplete_fields = ('student', 'lesson')
+    ordering = ('-id',)
@@ -0,0 +1,80 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+CATALOG_GENERATION_KEY = 'catalog_generation'
+ANONYMOUS_PAGE_TIMEOUT = 60 * 10
+
+
+def catalog_generation():
+    return cache.get_or_set(CATALOG_GENERATION_KEY, 1, None)
+
+
+async def acatalog_generation():
+    return await cache.aget_or_set(CATALOG_GENERATION_KEY, 1, None)
+
+
+def bump_catalog_generation():
+    """Orphan every cached anonymous catalog page after a course changes."""
+    try:
+        cache.incr(CATALOG_GENERATION_KEY)
+    except ValueError:
+        cache.set(CATALOG_GENERATION_KEY, 2, None)
+
+
+def _page_key(request, view_func, generation):
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"anon_page:{generation}:{view_func.__name__}:{digest}"
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def cache_anonymous_page(timeout=ANONYMOUS_PAGE_TIMEOUT):
+    """Serve whole GET responses from the cache for anonymous visitors.
+
+    Logged-in users always get a fresh render since the page shell shows
+    their name. Entries are keyed on the catalog generation, so any course
+    change makes them unreachable right away. Works on sync and async views.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != 'GET' or (await request.auser()).is_authenticated:
+                    return await view_func(request, *args, **kwargs)
+
+                key = _page_key(request, view_func, await acatalog_generation())
+                cached = await cache.aget(key)
+                if cached is not None:
+                    content, content_type = cached
+                    return HttpResponse(content, content_type=content_type)
+
+                response = await view_func(request, *args, **kwargs)
+                if _cacheable(response):
+                    await cache.aset(key, (response.content, response['Content-Type']), timeout)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+
+            key = _page_key(request, view_func, catalog_generation())
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view_func(request, *args, **kwargs)
+            if _cacheable(response):
+                cache.set(key, (response.content, response['Content-Type']), timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,101 @@
+"""Certificate issuing and PDF rendering.
+
+PDFs are rendered off the request path by the task worker and stored as
+CertificatePDF rows keyed by the sha256 of their HTML. Identical input is
+only ever rendered once, and a download is a single primary-key read.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from tasks.queue import task
+
+from .models import Certificate, CertificatePDF
+
+logger = logging.getLogger(__name__)
+
+CERTIFICATE_TEMPLATE = 'student/certificate.html'
+
+def certificate_html(certificate):
+    return render_to_string(CERTIFICATE_TEMPLATE, {
+        'certificate': certificate,
+        'user': certificate.student,
+        'course': certificate.course,
+    })
+
+
+def content_hash(html):
+    return hashlib.sha256(html.encode()).hexdigest()
+
+
+def has_pdf(certificate):
+    return bool(certificate.content_hash) and CertificatePDF.objects.filter(digest=certificate.content_hash).exists()
+
+
+def stored_pdf(certificate):
+    """The certificate's PDF bytes, or None until it has been rendered."""
+    if not certificate.content_hash:
+        return None
+    pdf = CertificatePDF.objects.filter(digest=certificate.content_hash).values_list('pdf', flat=True).first()
+    # Postgres hands back a memoryview
+    return bytes(pdf) if pdf is not None else None
+
+
+def render_pdf(html):
+    # Imported here: WeasyPrint loads Pango at import time, and only the
+    # render path should pay for that.
+    from weasyprint import HTML
+    return HTML(string=html, base_url=str(settings.BASE_DIR)).write_pdf()
+
+
+def render_certificate(certificate):
+    """Make sure the PDF for the certificate's current HTML is stored.
+
+    Returns True if a PDF had to be rendered, False if it was cached.
+    """
+    html = certificate_html(certificate)
+    digest = content_hash(html)
+    rendered = not CertificatePDF.objects.filter(digest=digest).exists()
+    if rendered:
+        # Two workers rendering the same HTML produce the same bytes
+        CertificatePDF.objects.bulk_create([CertificatePDF(digest=digest, pdf=render_pdf(html))], ignore_conflicts=True)
+    if certificate.content_hash != digest:
+        certificate.content_hash = digest
+        certificate.rendered_at = timezone.now()
+        Certificate.objects.filter(pk=certificate.pk).update(
+            content_hash=digest, rendered_at=certificate.rendered_at,
+        )
+    return rendered
+
+
+@task
+def render_certificate_by_id(certificate_id):
+    # Runs on a worker thread, which owns its own database connection
+    close_old_connections()
+    try:
+        certificate = Certificate.objects.select_related('student', 'course').get(pk=certificate_id)
+        return render_certificate(certificate)
+    except Certificate.DoesNotExist:
+        return False
+    except Exception:
+        logger.exception("Rendering certificate %s failed", certificate_id)
+        raise
+    finally:
+        connection.close()
+
+
+def schedule_render(certificate):
+    """Queue a render; a no-op while one for this certificate is already pending."""
+    render_certificate_by_id.enqueue(certificate.pk, key=f'certificate:{certificate.pk}')
+
+
+def issue_certificate(student, course_id):
+    """Issue the student's certificate for a course, rendering it in the background."""
+    certificate, created = Certificate.objects.get_or_create(student=student, course_id=course_id)
+    if created:
+        schedule_render(certificate)
+    return certificate
@@ -0,0 +1,68 @@
+from django.http import Http404
+
+from .drip import aget_drip_state, lesson_unlock_at
+from .models import Course, Enrollment, Lesson, StudentProgress
+from .outline import aget_course_outline
+
+
+async def abuild_classroom(user, course, lesson_id=None):
+    """Load the module/lesson/completion tree for the classroom page.
+
+    Runs a fixed number of queries no matter how many modules or lessons
+    the course has. Returns None when ``user`` isn't enrolled in ``course``.
+    """
+    enrollment = await Enrollment.objects.filter(student=user, course=course).afirst()
+    if enrollment is None:
+        return None
+
+    outline = await aget_course_outline(course.id)
+    drip = await aget_drip_state(enrollment.id)
+    lessons = outline.lessons
+
+    selected = next((lesson for lesson in lessons if lesson.id in drip.lesson_ids), None)
+    if lesson_id:
+        selected = next((lesson for lesson in lessons if lesson.id == lesson_id), None)
+        if selected is None:
+            raise Http404("No lesson matches the given query.")
+
+    # A locked lesson shows when it opens instead of its content
+    locked_until = None
+    if selected is not None and selected.id not in drip.lesson_ids:
+        module = next(module for module in outline.modules if selected in module.lessons)
+        locked_until = lesson_unlock_at(enrollment.enrolled_on, module, selected)
+
+    # The outline only carries what the sidebar needs; load the full lesson
+    # body for the one being watched.
+    selected_lesson = None
+    if selected is not None and locked_until is None:
+        selected_lesson = await Lesson.objects.aget(id=selected.id)
+
+    # A set keeps the per-lesson "completed?" check in the template O(1)
+    completed_lessons = {
+        lesson_id async for lesson_id in StudentProgress.objects.filter(
+            student=user,
+            lesson__module__course=course,
+            completed=True,
+        ).values_list('lesson_id', flat=True)
+    }
+
+    related_courses = [
+        related async for related in Course.objects.for_card()
+        .filter(category=course.category)
+        .exclude(id=course.id)[:4]
+    ]
+
+    return {
+        'course': course,
+        'modules': outline.modules,
+        'selected_lesson': selected_lesson,
+        'locked_lesson': selected if locked_until else None,
+        'locked_until': locked_until,
+        'unlocked_lessons': drip.lesson_ids,
+        'next_unlock_at': drip.next_unlock_at,
+        'completed_lessons': completed_lessons,
+        'is_completed': selected_lesson is not None and selected_lesson.id in completed_lessons,
+        'all_completed': enrollment.is_complete,
+        'enrollment': enrollment,
+        'related_courses': related_courses,
+    }
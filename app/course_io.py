@@ -0,0 +1,234 @@
+"""Streaming course import and export.
+
+A course package is a flat sequence of records, one per line in JSON Lines
+or one per row in CSV (a header row, then a ``type`` column plus the
+fields below):
+
+    {"type": "course", "title": "...", "description": "...", "price": "19.00"}
+    {"type": "module", "title": "...", "order": 1, "available_after_days": 0}
+    {"type": "lesson", "title": "...", "order": 1, "video_url": "...", "notes": "..."}
+
+Modules belong to the course above them and lessons to the module above
+them. An import holds at most ``batch_size`` courses in memory, inserts
+each batch with bulk_create and runs in one transaction, so a bad line
+leaves nothing behind. Imported courses always start unpublished: an
+``is_published`` value in the package is ignored.
+"""
+import csv
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .caching import bump_catalog_generation
+from .models import Course, Lesson, Module, User
+from .search import get_search_backend
+
+FIELDS = {
+    'course': (
+        'title', 'description', 'category', 'course_type', 'price', 'is_free', 'is_published',
+        'thmb', 'cover_url', 'instructor',
+    ),
+    'module': ('title', 'order', 'available_after_days'),
+    'lesson': ('title', 'order', 'available_after_days', 'video_url', 'notes'),
+}
+CSV_COLUMNS = [
+    'type', 'title', 'order', 'available_after_days', 'description', 'category', 'course_type',
+    'price', 'is_free', 'is_published', 'thmb', 'cover_url', 'instructor', 'video_url', 'notes',
+]
+BATCH_COURSES = 100
+EXPORT_CHUNK = 100
+
+
+class PackageError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+
+@dataclass
+class ImportResult:
+    courses: int = 0
+    modules: int = 0
+    lessons: int = 0
+
+
+def _text(lines):
+    # Uploaded files iterate as bytes
+    for line in lines:
+        yield line.decode('utf-8-sig') if isinstance(line, bytes) else line
+
+
+def read_jsonl(lines):
+    """Yield (line number, record) pairs from JSON Lines."""
+    for number, line in enumerate(_text(lines), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise PackageError(number, f"invalid JSON ({exc})") from exc
+        if not isinstance(record, dict):
+            raise PackageError(number, "expected a JSON object")
+        yield number, record
+
+
+def read_csv(lines):
+    """Yield (line number, record) pairs from CSV; empty cells are left out."""
+    reader = csv.DictReader(_text(lines))
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def _build(model, kind, line, record, position):
+    unknown = set(record) - set(FIELDS[kind])
+    if unknown:
+        raise PackageError(line, f"unknown {kind} field(s): {', '.join(sorted(unknown))}")
+    if kind != 'course':
+        record.setdefault('order', position)
+    instance = model(**record)
+    try:
+        # Converts CSV strings to the field types as it validates
+        instance.full_clean(exclude=['course', 'module', 'instructor'], validate_unique=False,
+                            validate_constraints=False)
+    except ValidationError as exc:
+        messages = '; '.join(f"{field}: {' '.join(errors)}" for field, errors in exc.message_dict.items())
+        raise PackageError(line, messages) from exc
+    return instance
+
+
+class _Importer:
+    def __init__(self, instructor, batch_size):
+        self.instructor = instructor
+        self.batch_size = batch_size
+        self.instructors = {}
+        self.batch = []  # [(course, [(module, [lesson, ...]), ...]), ...]
+        self.result = ImportResult()
+
+    def add(self, line, record):
+        kind = record.pop('type', None)
+        if kind == 'course':
+            if len(self.batch) >= self.batch_size:
+                self.flush()
+            username = record.pop('instructor', None)
+            # Exports carry it, but an imported course starts as a draft
+            record.pop('is_published', None)
+            course = _build(Course, kind, line, record, len(self.batch))
+            course.instructor = self.instructor or self.lookup(line, username)
+            self.batch.append((course, []))
+        elif kind == 'module':
+            if not self.batch:
+                raise PackageError(line, "module before any course")
+            modules = self.batch[-1][1]
+            modules.append((_build(Module, kind, line, record, len(modules) + 1), []))
+        elif kind == 'lesson':
+            if not self.batch or not self.batch[-1][1]:
+                raise PackageError(line, "lesson before any module")
+            lessons = self.batch[-1][1][-1][1]
+            lessons.append(_build(Lesson, kind, line, record, len(lessons) + 1))
+        else:
+            raise PackageError(line, f"unknown record type {kind!r}")
+
+    def lookup(self, line, username):
+        if not username:
+            raise PackageError(line, "course has no instructor")
+        if username not in self.instructors:
+            self.instructors[username] = User.objects.filter(username=username, is_instructor=True).first()
+        if self.instructors[username] is None:
+            raise PackageError(line, f"no instructor named {username!r}")
+        return self.instructors[username]
+
+    def flush(self):
+        if not self.batch:
+            return
+        courses = Course.objects.bulk_create([course for course, _ in self.batch])
+        modules, lessons = [], []
+        for course, course_modules in self.batch:
+            for module, module_lessons in course_modules:
+                module.course = course
+                modules.append(module)
+        Module.objects.bulk_create(modules)
+        for course, course_modules in self.batch:
+            for module, module_lessons in course_modules:
+                for lesson in module_lessons:
+                    lesson.module = module
+                    lessons.append(lesson)
+        Lesson.objects.bulk_create(lessons, batch_size=1000)
+
+        # bulk_create skips the Course signals, so index here
+        backend = get_search_backend()
+        for course in courses:
+            backend.index_course(course)
+
+        self.result.courses += len(courses)
+        self.result.modules += len(modules)
+        self.result.lessons += len(lessons)
+        self.batch = []
+
+
+def import_package(records, instructor=None, batch_size=BATCH_COURSES):
+    """Create the courses in ``records`` ((line, dict) pairs from a reader).
+
+    With ``instructor`` every course belongs to that user; otherwise each
+    course record names its instructor by username. Raises PackageError
+    and rolls everything back on the first bad record.
+    """
+    importer = _Importer(instructor, batch_size)
+    with transaction.atomic():
+        for line, record in records:
+            importer.add(line, record)
+        importer.flush()
+        if importer.result.courses:
+            transaction.on_commit(bump_catalog_generation)
+    return importer.result
+
+
+def export_records(courses):
+    """Yield package records for ``courses``, a chunk of courses at a time."""
+    courses = courses.select_related('instructor').prefetch_related(
+        Prefetch('modules', queryset=Module.objects.order_by('order', 'id')),
+        Prefetch('modules__lessons', queryset=Lesson.objects.order_by('order', 'id')),
+    ).order_by('id')
+    for course in courses.iterator(chunk_size=EXPORT_CHUNK):
+        record = {'type': 'course'}
+        for field in FIELDS['course']:
+            record[field] = course.instructor.username if field == 'instructor' else getattr(course, field)
+        yield record
+        for module in course.modules.all():
+            yield {'type': 'module', **{field: getattr(module, field) for field in FIELDS['module']}}
+            for lesson in module.lessons.all():
+                yield {'type': 'lesson', **{field: getattr(lesson, field) for field in FIELDS['lesson']}}
+
+
+def write_jsonl(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+class EchoBuffer:
+    # csv.writer wants a file; hand each formatted row straight back instead
+    def write(self, value):
+        return value
+
+
+def write_csv(records):
+    writer = csv.DictWriter(EchoBuffer(), CSV_COLUMNS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+FORMATS = {
+    'jsonl': (read_jsonl, write_jsonl, 'application/x-ndjson'),
+    'csv': (read_csv, write_csv, 'text/csv'),
+}
+
+
+def package_format(filename):
+    suffix = Path(filename or '').suffix.lower().lstrip('.')
+    return 'jsonl' if suffix in ('json', 'ndjson') else suffix
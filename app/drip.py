@@ -0,0 +1,209 @@
+"""Drip schedules: when each module and lesson unlocks for an enrollment.
+
+Every enrollment gets an UnlockEvent timeline when it's created, so asking
+what's unlocked is a range query instead of date arithmetic per row. The
+resulting DripState is cached until the next unlock, so it can never go
+stale and never lingers past the moment something new opens up.
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from tasks.queue import task
+
+from .models import Enrollment, Module, UnlockEvent
+from .outline import get_course_outline
+
+# Upper bound for a cached state with nothing left to unlock
+DRIP_STATE_TIMEOUT = 60 * 60 * 24
+BATCH_SIZE = 1000
+# Courses with more enrollments than this are rescheduled by the worker
+INLINE_SCHEDULE_LIMIT = 200
+
+
+@dataclass(frozen=True)
+class DripState:
+    module_ids: frozenset
+    lesson_ids: frozenset
+    next_unlock_at: datetime | None = None
+
+    def timeout(self, now=None, cap=DRIP_STATE_TIMEOUT):
+        """Seconds this state stays true, for use as a cache TTL."""
+        if self.next_unlock_at is None:
+            return cap
+        remaining = (self.next_unlock_at - (now or timezone.now())).total_seconds()
+        return max(1, min(cap, math.ceil(remaining)))
+
+
+def module_unlock_at(enrolled_on, module):
+    return enrolled_on + timedelta(days=max(module.available_after_days, 0))
+
+
+def lesson_unlock_at(enrolled_on, module, lesson):
+    # A lesson can't open before the module it sits in
+    days = max(module.available_after_days, lesson.available_after_days, 0)
+    return enrolled_on + timedelta(days=days)
+
+
+def timeline(enrollment_id, enrolled_on, outline):
+    for module in outline.modules:
+        yield UnlockEvent(
+            enrollment_id=enrollment_id, module_id=module.id,
+            unlock_at=module_unlock_at(enrolled_on, module),
+        )
+        for lesson in module.lessons:
+            yield UnlockEvent(
+                enrollment_id=enrollment_id, module_id=module.id, lesson_id=lesson.id,
+                unlock_at=lesson_unlock_at(enrolled_on, module, lesson),
+            )
+
+
+def drip_cache_key(enrollment_id):
+    return f"drip_state:{enrollment_id}"
+
+
+def schedule_enrollment(enrollment):
+    """Write (or rewrite) the unlock timeline for one enrollment."""
+    outline = get_course_outline(enrollment.course_id)
+    with transaction.atomic():
+        UnlockEvent.objects.filter(enrollment_id=enrollment.id).delete()
+        UnlockEvent.objects.bulk_create(timeline(enrollment.id, enrollment.enrolled_on, outline))
+    cache.delete(drip_cache_key(enrollment.id))
+
+
+@task
+def schedule_course(course_id):
+    """Rebuild the timelines of every enrollment in a course from scratch.
+    Returns the number of enrollments.
+
+    Queued by reschedule_modules for big courses, and run directly by
+    `manage.py rebuild_unlocks`.
+    """
+    outline = get_course_outline(course_id)
+    enrollments = list(Enrollment.objects.filter(course_id=course_id).values_list('id', 'enrolled_on'))
+    with transaction.atomic():
+        UnlockEvent.objects.filter(enrollment__course_id=course_id).delete()
+        events = (
+            event
+            for enrollment_id, enrolled_on in enrollments
+            for event in timeline(enrollment_id, enrolled_on, outline)
+        )
+        UnlockEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    cache.delete_many([drip_cache_key(enrollment_id) for enrollment_id, _ in enrollments])
+    return len(enrollments)
+
+
+def _module_timeline(enrollment_id, enrolled_on, module):
+    yield UnlockEvent(enrollment_id=enrollment_id, module_id=module.id, unlock_at=module_unlock_at(enrolled_on, module))
+    for lesson in module.lessons.all():
+        yield UnlockEvent(
+            enrollment_id=enrollment_id, module_id=module.id, lesson_id=lesson.id,
+            unlock_at=lesson_unlock_at(enrolled_on, module, lesson),
+        )
+
+
+def _forget_states(enrollment_ids):
+    keys = [drip_cache_key(enrollment_id) for enrollment_id in enrollment_ids]
+    # Again after commit, so a state cached mid-transaction doesn't outlive it
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def reschedule_modules(course_id, module_ids):
+    """Bring unlock events up to date after modules of a course changed.
+
+    Small courses are rewritten inline so students see the change at once;
+    for bigger ones that's too many rows for a request, so a keyed
+    schedule_course is queued instead and repeated edits share one rebuild.
+    """
+    enrollments = Enrollment.objects.filter(course_id=course_id)[:INLINE_SCHEDULE_LIMIT + 1].count()
+    if enrollments > INLINE_SCHEDULE_LIMIT:
+        schedule_course.enqueue(course_id, key=f'schedule_course:{course_id}')
+    elif enrollments:
+        schedule_modules(module_ids)
+
+
+def schedule_modules(module_ids):
+    """Rewrite the unlock events of ``module_ids`` and their lessons for every
+    enrollment in the course, in the caller's transaction.
+
+    Returns the number of enrollments.
+    """
+    modules = list(Module.objects.filter(id__in=module_ids).prefetch_related('lessons'))
+    if not modules:
+        return 0
+    enrollments = list(Enrollment.objects.filter(course_id=modules[0].course_id).values_list('id', 'enrolled_on'))
+    if not enrollments:
+        return 0
+    lesson_ids = [lesson.id for module in modules for lesson in module.lessons.all()]
+    with transaction.atomic():
+        # By lesson too, so a lesson that changed modules drops its old rows
+        UnlockEvent.objects.filter(Q(module_id__in=module_ids) | Q(lesson_id__in=lesson_ids)).delete()
+        events = (
+            event
+            for enrollment_id, enrolled_on in enrollments
+            for module in modules
+            for event in _module_timeline(enrollment_id, enrolled_on, module)
+        )
+        UnlockEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    _forget_states(enrollment_id for enrollment_id, _ in enrollments)
+    return len(enrollments)
+
+
+def _unlocked_rows(enrollment_id, now):
+    return UnlockEvent.objects.filter(enrollment_id=enrollment_id, unlock_at__lte=now).values_list(
+        'module_id', 'lesson_id'
+    )
+
+
+def _next_unlock(enrollment_id, now):
+    return (
+        UnlockEvent.objects.filter(enrollment_id=enrollment_id, unlock_at__gt=now)
+        .order_by('unlock_at')
+        .values_list('unlock_at', flat=True)[:1]
+    )
+
+
+def _state(rows, next_unlock_at):
+    module_ids, lesson_ids = set(), set()
+    for module_id, lesson_id in rows:
+        if lesson_id is None:
+            module_ids.add(module_id)
+        else:
+            lesson_ids.add(lesson_id)
+    return DripState(frozenset(module_ids), frozenset(lesson_ids), next_unlock_at)
+
+
+def build_drip_state(enrollment_id, now=None):
+    now = now or timezone.now()
+    return _state(_unlocked_rows(enrollment_id, now), _next_unlock(enrollment_id, now).first())
+
+
+async def abuild_drip_state(enrollment_id, now=None):
+    now = now or timezone.now()
+    rows = [row async for row in _unlocked_rows(enrollment_id, now)]
+    return _state(rows, await _next_unlock(enrollment_id, now).afirst())
+
+
+def get_drip_state(enrollment_id):
+    """What's unlocked right now, cached until the next unlock."""
+    key = drip_cache_key(enrollment_id)
+    state = cache.get(key)
+    if state is None:
+        state = build_drip_state(enrollment_id)
+        cache.set(key, state, state.timeout())
+    return state
+
+
+async def aget_drip_state(enrollment_id):
+    key = drip_cache_key(enrollment_id)
+    state = await cache.aget(key)
+    if state is None:
+        state = await abuild_drip_state(enrollment_id)
+        await cache.aset(key, state, state.timeout())
+    return state
@@ -0,0 +1,98 @@
+"""Bulk data seeding for benchmarks and local load testing."""
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+
+from .drip import schedule_course
+from .models import Course, Enrollment, Lesson, Module, StudentProgress, User
+from .progress import recompute_enrollment_progress
+from .search import get_search_backend
+
+PASSWORD = 'benchmark-password'
+CATEGORIES = ['web', 'data', 'design', 'mobile', 'devops', 'security']
+
+
+@dataclass
+class Dataset:
+    instructors: list = field(default_factory=list)
+    students: list = field(default_factory=list)
+    courses: list = field(default_factory=list)
+    modules: list = field(default_factory=list)
+    lessons: list = field(default_factory=list)
+
+
+def seed_dataset(
+    instructors=3,
+    courses_per_instructor=4,
+    modules_per_course=3,
+    lessons_per_module=5,
+    students=10,
+    enrollments_per_student=3,
+    completion_ratio=0.5,
+    prefix='bench',
+):
+    """Create a self-consistent catalog with enrollments and progress.
+
+    Rows go in with bulk_create, so the counters, drip timelines and the
+    search index are rebuilt at the end instead of per row through signals.
+    """
+    password = make_password(PASSWORD)
+    data = Dataset()
+
+    data.instructors = User.objects.bulk_create(
+        User(username=f'{prefix}-instructor-{i}', password=password, is_instructor=True)
+        for i in range(instructors)
+    )
+    data.students = User.objects.bulk_create(
+        User(username=f'{prefix}-student-{i}', password=password) for i in range(students)
+    )
+
+    data.courses = Course.objects.bulk_create(
+        Course(
+            title=f'{prefix} course {i}-{n}',
+            instructor=instructor,
+            category=CATEGORIES[(i + n) % len(CATEGORIES)],
+            course_type=Course.COURSE_TYPE_CHOICES[n % 3][0],
+            description=f'Description of {prefix} course {i}-{n}. ' * 20,
+            thmb=f'https://example.com/{prefix}/{i}/{n}.png',
+            is_free=n % 2 == 0,
+            price=0 if n % 2 == 0 else 10 + n,
+            is_published=True,
+        )
+        for i, instructor in enumerate(data.instructors)
+        for n in range(courses_per_instructor)
+    )
+    data.modules = Module.objects.bulk_create(
+        Module(course=course, title=f'Module {m}', order=m + 1)
+        for course in data.courses
+        for m in range(modules_per_course)
+    )
+    data.lessons = Lesson.objects.bulk_create(
+        Lesson(module=module, title=f'Lesson {n}', order=n + 1, notes='Notes ' * 50)
+        for module in data.modules
+        for n in range(lessons_per_module)
+    )
+
+    lessons_by_course = {}
+    for lesson in data.lessons:
+        lessons_by_course.setdefault(lesson.module.course_id, []).append(lesson)
+
+    enrollments, progress = [], []
+    for s, student in enumerate(data.students):
+        for k in range(min(enrollments_per_student, len(data.courses))):
+            course = data.courses[(s + k) % len(data.courses)]
+            enrollments.append(Enrollment(student=student, course=course))
+            course_lessons = lessons_by_course.get(course.id, [])
+            done = int(len(course_lessons) * completion_ratio)
+            progress.extend(
+                StudentProgress(student=student, lesson=lesson, completed=True)
+                for lesson in course_lessons[:done]
+            )
+    Enrollment.objects.bulk_create(enrollments)
+    StudentProgress.objects.bulk_create(progress)
+
+    recompute_enrollment_progress()
+    for course in data.courses:
+        schedule_course(course.id)
+    get_search_backend().rebuild()
+    return data
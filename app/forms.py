@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 
+from .models import Course
+
 User = get_user_model()
 
 
@@ -33,3 +35,26 @@ class CustomUserCreationForm(UserCreationForm):
                 "class": "w-full px-4 py-2 border rounded-lg focus:ring-2 focus:ring-indigo-400"
             }),
         }
+
+
+class ReportFilterForm(forms.Form):
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={
+        "type": "date", "class": "w-full px-4 py-2 border rounded-lg focus:ring-2 focus:ring-indigo-400"
+    }))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={
+        "type": "date", "class": "w-full px-4 py-2 border rounded-lg focus:ring-2 focus:ring-indigo-400"
+    }))
+    course = forms.ModelChoiceField(queryset=None, required=False, empty_label="All courses", widget=forms.Select(attrs={
+        "class": "w-full px-4 py-2 border rounded-lg focus:ring-2 focus:ring-indigo-400"
+    }))
+
+    def __init__(self, instructor, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["course"].queryset = Course.objects.filter(instructor=instructor).only("id", "title").order_by("title")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get("start"), cleaned_data.get("end")
+        if start and end and start > end:
+            raise forms.ValidationError("The start date must be on or before the end date.")
+        return cleaned_data
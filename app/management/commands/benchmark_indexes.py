@@ -0,0 +1,148 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from app.models import Course, Enrollment, Lesson, Module, StudentProgress, User
+
+LESSONS_PER_MODULE = 10
+MODULES_PER_COURSE = 10
+COURSES_WITH_CONTENT = 10
+CATEGORIES = ['web', 'data', 'design', 'mobile', 'devops', 'security', 'ai', 'cloud']
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and print query plans for the hot "
+        "StudentProgress/Enrollment/Course filters before and after the indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="StudentProgress rows to seed.")
+        parser.add_argument('--courses', type=int, default=10_000, help="Catalog size to seed.")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        # Never touch the real database: build a test database next to it
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            started = time.monotonic()
+            probes = self.seed(options['rows'], options['courses'], options['batch_size'])
+            self.stdout.write(f"Seeded in {time.monotonic() - started:.1f}s")
+
+            after = self.explain_all(probes)
+            self.drop_indexes()
+            before = self.explain_all(probes)
+
+            for title, _ in probes['queries']:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {title}"))
+                self.stdout.write("-- before")
+                self.stdout.write(before[title])
+                self.stdout.write("-- after")
+                self.stdout.write(after[title])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, rows, n_courses, batch_size):
+        instructor = User.objects.create(username='bench-instructor', is_instructor=True)
+
+        Course.objects.bulk_create(
+            (
+                Course(
+                    title=f"Course {i}",
+                    category=CATEGORIES[i % len(CATEGORIES)],
+                    course_type=Course.COURSE_TYPE_CHOICES[i % 3][0],
+                    is_free=i % 4 == 0,
+                    is_published=i % 2 == 0,
+                    instructor=instructor,
+                    description="",
+                )
+                for i in range(n_courses)
+            ),
+            batch_size=batch_size,
+        )
+        courses = list(Course.objects.order_by('id')[:COURSES_WITH_CONTENT])
+
+        Module.objects.bulk_create(
+            Module(course=course, title=f"Module {m}", order=m)
+            for course in courses
+            for m in range(MODULES_PER_COURSE)
+        )
+        Lesson.objects.bulk_create(
+            (
+                Lesson(module=module, title=f"Lesson {n}", order=n)
+                for module in Module.objects.filter(course__in=courses)
+                for n in range(LESSONS_PER_MODULE)
+            ),
+            batch_size=batch_size,
+        )
+        lesson_ids = list(Lesson.objects.values_list('id', flat=True))
+
+        n_students = max(1, -(-rows // len(lesson_ids)))
+        User.objects.bulk_create(
+            (User(username=f"bench-student-{i}") for i in range(n_students)),
+            batch_size=batch_size,
+        )
+        students = list(User.objects.filter(is_instructor=False).values_list('id', flat=True))
+
+        Enrollment.objects.bulk_create(
+            (Enrollment(student_id=s, course=c) for s in students for c in courses),
+            batch_size=batch_size,
+        )
+
+        def progress_rows():
+            made = 0
+            for student_id in students:
+                for lesson_id in lesson_ids:
+                    if made == rows:
+                        return
+                    made += 1
+                    yield StudentProgress(student_id=student_id, lesson_id=lesson_id, completed=made % 3 != 0)
+
+        StudentProgress.objects.bulk_create(progress_rows(), batch_size=batch_size)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        student, course, lesson = students[len(students) // 2], courses[0], lesson_ids[0]
+        return {
+            'queries': [
+                ("classroom: completed lessons for student in course", StudentProgress.objects.filter(
+                    student_id=student, lesson__module__course=course, completed=True,
+                ).values_list('lesson_id', flat=True)),
+                ("mark complete: progress row lookup", StudentProgress.objects.filter(
+                    student_id=student, lesson_id=lesson,
+                )),
+                ("enrollments in course by date", Enrollment.objects.filter(
+                    course=course, enrolled_on__gte=timezone.now() - timedelta(days=30),
+                )),
+                ("home: category (case-insensitive)", Course.objects.alias(
+                    category_lower=Lower('category'),
+                ).filter(category_lower='web')),
+                ("all_courses: course_type + is_free", Course.objects.filter(
+                    course_type='BEGINNER', is_free=True,
+                )),
+                ("classroom: related courses", Course.objects.filter(category='web')[:4]),
+            ],
+        }
+
+    def explain_all(self, probes):
+        return {title: queryset.explain() for title, queryset in probes['queries']}
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in (Course, StudentProgress, Enrollment):
+                indexes, constraints = model._meta.indexes, model._meta.constraints
+                # SQLite drops a unique constraint by rebuilding the table from
+                # the model, so the model must not declare it any more.
+                model._meta.indexes, model._meta.constraints = [], []
+                try:
+                    for index in indexes:
+                        editor.remove_index(model, index)
+                    for constraint in constraints:
+                        editor.remove_constraint(model, constraint)
+                finally:
+                    model._meta.indexes, model._meta.constraints = indexes, constraints
@@ -0,0 +1,208 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from app import urls as app_urls
+from analytics import urls as analytics_urls
+from analytics.rollups import rollup_stats
+from app.factories import seed_dataset
+from payment import urls as payment_urls
+
+
+def _last_lesson(data, course):
+    # The seeded student has only completed the first half of each course
+    return [lesson for lesson in data.lessons if lesson.module.course_id == course.id][-1]
+
+
+# (url name, who is logged in, kwargs builder, max queries on a cold cache or None)
+# Anything listed in CONSTANT must run the same number of queries at every
+# dataset scale, which is what catches N+1 regressions.
+CASES = [
+    ('home', None, lambda d: {}, 4),
+    ('course_detail', None, lambda d: {'course_id': d.courses[0].id}, 4),
+    ('lesson_detail', None, lambda d: {'lesson_id': d.lessons[0].id}, 2),
+    ('login', None, lambda d: {}, 0),
+    ('register', None, lambda d: {}, 0),
+    ('logout', 'student', lambda d: {}, 4),
+    ('instructor_dashboard', 'instructor', lambda d: {}, 4),
+    ('create_course', 'instructor', lambda d: {}, 2),
+    ('add_module', 'instructor', lambda d: {'course_id': d.courses[0].id}, 3),
+    ('edit_module', 'instructor', lambda d: {'module_id': d.modules[0].id}, 4),
+    ('add_lesson', 'instructor', lambda d: {'module_id': d.modules[0].id}, 3),
+    ('edit_lesson', 'instructor', lambda d: {'lesson_id': d.lessons[0].id}, 4),
+    ('instructor_edit_course', 'instructor', lambda d: {'course_id': d.courses[0].id}, 5),
+    # Empty body, so this measures the validation path only
+    ('reorder_course', 'instructor', lambda d: {'course_id': d.courses[0].id}, 3),
+    ('import_courses', 'instructor', lambda d: {}, 2),
+    # Streaming: only the queries before the first chunk
+    ('export_courses', 'instructor', lambda d: {}, 2),
+    ('instructor_reports', 'instructor', lambda d: {}, 3),
+    ('export_report', 'instructor', lambda d: {'report': 'progress'}, 2),
+    ('student_dashboard', 'student', lambda d: {}, 4),
+    ('view_course', 'student', lambda d: {'course_id': d.courses[0].id}, 5),
+    ('classroom_view', 'student', lambda d: {'course_id': d.courses[0].id}, 8),
+    ('mark_lesson_complete', 'student', lambda d: {
+        'course_id': d.courses[0].id, 'lesson_id': _last_lesson(d, d.courses[0]).id,
+    }, 13),
+    ('zoom_classroom', 'student', lambda d: {'course_id': d.courses[0].id}, 3),
+    # The seeded student is half way through, so this is the not-eligible path
+    ('generate_certificate', 'student', lambda d: {'course_id': d.courses[0].id}, 4),
+    ('buy_course', 'student', lambda d: {'course_id': d.courses[0].id}, 4),
+    ('payment_success', 'student', lambda d: {'course_id': d.courses[0].id}, 8),
+    # Unsigned, so this measures the rejection path only
+    ('stripe_webhook', None, lambda d: {}, 0),
+    ('payout_request', 'instructor', lambda d: {}, 5),
+    ('all_courses', None, lambda d: {}, 2),
+    ('about', None, lambda d: {}, 2),
+    ('instructor_analytics', 'instructor', lambda d: {}, 6),
+    # Cascading a course delete is proportional to its size; record it only
+    ('delete_cus', 'instructor', lambda d: {'id': d.courses[-1].id}, None),
+]
+CONSTANT = {
+    'home', 'course_detail', 'instructor_dashboard', 'instructor_edit_course',
+    'student_dashboard', 'view_course', 'classroom_view', 'all_courses', 'about', 'instructor_analytics',
+}
+
+SCALES = {
+    1: dict(instructors=3, courses_per_instructor=4, modules_per_course=3, lessons_per_module=5,
+            students=10, enrollments_per_student=3),
+    4: dict(instructors=12, courses_per_instructor=8, modules_per_course=6, lessons_per_module=10,
+            students=40, enrollments_per_student=8),
+}
+
+POST_ONLY = {'logout', 'stripe_webhook', 'reorder_course'}
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database, request every app/payment/analytics URL and record "
+        "query counts, wall time and response size. Fails when a budget is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1,4', help="Comma-separated dataset scales to run.")
+        parser.add_argument('--output', help="Write results as JSON to this path.")
+        parser.add_argument('--baseline', help="Earlier --output file to diff query counts against.")
+
+    def handle(self, *args, **options):
+        self.check_coverage()
+        scales = [int(scale) for scale in options['scales'].split(',')]
+        unknown = set(scales) - set(SCALES)
+        if unknown:
+            raise CommandError(f"Unknown scale(s): {sorted(unknown)}. Choose from {sorted(SCALES)}.")
+
+        results = []
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Replicas aren't part of the test database, so read from the primary
+            with override_settings(CACHES=LOCAL_CACHE, DATABASE_REPLICAS=[]):
+                for scale in scales:
+                    results.extend(self.run_scale(scale))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        failures = self.check_budgets(results)
+        report = {'scales': {scale: SCALES[scale] for scale in scales}, 'results': results, 'failures': failures}
+        self.print_report(results, options.get('baseline'))
+
+        if options.get('output'):
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f"{len(failures)} budget(s) exceeded.")
+        self.stdout.write(self.style.SUCCESS("All view budgets met."))
+
+    def check_coverage(self):
+        names = {pattern.name for pattern in app_urls.urlpatterns + payment_urls.urlpatterns + analytics_urls.urlpatterns}
+        missing = names - {case[0] for case in CASES}
+        if missing:
+            raise CommandError(f"No benchmark case for URL(s): {', '.join(sorted(missing))}")
+
+    def run_scale(self, scale):
+        # One test database for the whole run (an in-memory SQLite one can't
+        # be recreated in-process), emptied before every scale.
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        data = seed_dataset(**SCALES[scale])
+        # So the analytics page reads real rollups
+        rollup_stats(grace=timedelta(0))
+        users = {'student': data.students[0], 'instructor': data.instructors[0]}
+        rows = []
+        for name, role, kwargs, budget in CASES:
+            client = Client()
+            if role:
+                client.force_login(users[role])
+            path = reverse(name, kwargs=kwargs(data))
+            method = client.post if name in POST_ONLY else client.get
+            rows.append(self.measure(client, method, path, name, scale, budget, cold=True))
+            rows.append(self.measure(client, method, path, name, scale, budget, cold=False))
+        return rows
+
+    def measure(self, client, method, path, name, scale, budget, cold):
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            response = method(path)
+        elapsed = (time.perf_counter() - started) * 1000
+        body = b'' if response.streaming else response.content
+        return {
+            'name': name,
+            'path': path,
+            'scale': scale,
+            'cache': 'cold' if cold else 'warm',
+            'status': response.status_code,
+            'queries': len(ctx),
+            'budget': budget,
+            'ms': round(elapsed, 2),
+            'bytes': len(body),
+        }
+
+    def check_budgets(self, results):
+        failures = []
+        counts = {}
+        for row in results:
+            if row['status'] >= 500:
+                failures.append(f"{row['name']} returned {row['status']} at scale {row['scale']}")
+            if row['cache'] != 'cold':
+                continue
+            if row['budget'] is not None and row['queries'] > row['budget']:
+                failures.append(
+                    f"{row['name']} ran {row['queries']} queries at scale {row['scale']} "
+                    f"(budget {row['budget']})"
+                )
+            counts.setdefault(row['name'], set()).add(row['queries'])
+        for name in sorted(CONSTANT):
+            if len(counts.get(name, ())) > 1:
+                failures.append(f"{name} query count grows with the dataset: {sorted(counts[name])}")
+        return failures
+
+    def print_report(self, results, baseline_path):
+        previous = {}
+        if baseline_path:
+            with open(baseline_path) as fh:
+                for row in json.load(fh)['results']:
+                    previous[(row['name'], row['scale'], row['cache'])] = row['queries']
+
+        self.stdout.write(f"{'view':<24}{'scale':>6}{'cache':>7}{'status':>7}{'queries':>9}{'ms':>10}{'bytes':>10}")
+        for row in results:
+            line = (
+                f"{row['name']:<24}{row['scale']:>6}{row['cache']:>7}{row['status']:>7}"
+                f"{row['queries']:>9}{row['ms']:>10.1f}{row['bytes']:>10}"
+            )
+            before = previous.get((row['name'], row['scale'], row['cache']))
+            if before is not None and before != row['queries']:
+                line += f"  ({row['queries'] - before:+d} vs baseline)"
+            self.stdout.write(line)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from app.course_io import FORMATS, export_records
+from app.models import Course
+
+
+class Command(BaseCommand):
+    help = "Stream courses with their modules and lessons as a JSON Lines or CSV package."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='jsonl')
+        parser.add_argument('--output', help="File to write; defaults to stdout.")
+        parser.add_argument('--instructor', help="Only courses taught by this username.")
+        parser.add_argument('--course', type=int, action='append', help="Only this course id (repeatable).")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['instructor']:
+            courses = courses.filter(instructor__username=options['instructor'])
+        if options['course']:
+            courses = courses.filter(id__in=options['course'])
+
+        writer = FORMATS[options['format']][1]
+        chunks = writer(export_records(courses))
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+            fh.writelines(chunks)
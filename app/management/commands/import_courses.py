@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.course_io import BATCH_COURSES, FORMATS, PackageError, import_package, package_format
+from app.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a JSON Lines or CSV course package (see app.course_io). The file is "
+        "read as a stream and written in bulk inside one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Package file, or - for stdin.")
+        parser.add_argument('--format', choices=sorted(FORMATS), help="Defaults to the file extension.")
+        parser.add_argument('--instructor', help="Username that owns every course, instead of each record's.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_COURSES, help="Courses per bulk insert.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or package_format(options['path'])
+        if fmt not in FORMATS:
+            raise CommandError("Can't tell the package format; pass --format.")
+
+        instructor = None
+        if options['instructor']:
+            instructor = User.objects.filter(username=options['instructor'], is_instructor=True).first()
+            if instructor is None:
+                raise CommandError(f"No instructor named {options['instructor']!r}.")
+
+        reader = FORMATS[fmt][0]
+        fh = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8-sig', newline='')
+        try:
+            result = import_package(reader(fh), instructor=instructor, batch_size=options['batch_size'])
+        except PackageError as exc:
+            raise CommandError(f"{exc}. Nothing was imported.")
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.courses} course(s), {result.modules} module(s), {result.lessons} lesson(s)."
+        ))
@@ -0,0 +1,65 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent GETs at an already running server and report throughput "
+        "and latency per concurrency level. Run it once against the WSGI server "
+        "and once against the ASGI one (see Lms/asgi.py) to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help="e.g. http://127.0.0.1:8000")
+        parser.add_argument('--paths', default='/,/all_courses,/course/1/',
+                            help="Comma-separated paths, requested round-robin.")
+        parser.add_argument('--concurrency', default='1,8,32,64', help="Comma-separated client counts.")
+        parser.add_argument('--requests', type=int, default=400, help="Requests per concurrency level.")
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--session', help="sessionid cookie, to load pages as a logged-in user.")
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        paths = [path.strip() for path in options['paths'].split(',') if path.strip()]
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        if not paths:
+            raise CommandError("Give at least one path.")
+
+        headers = {'User-Agent': 'lms-loadtest'}
+        if options['session']:
+            headers['Cookie'] = f"sessionid={options['session']}"
+
+        def fetch(path):
+            request = urllib.request.Request(base_url + path, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options['timeout']) as response:
+                    response.read()
+                    ok = response.status < 500
+            except urllib.error.HTTPError as exc:
+                ok = exc.code < 500
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return ok, (time.perf_counter() - started) * 1000
+
+        self.stdout.write(f"{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for level in levels:
+            urls = list(islice(cycle(paths), options['requests']))
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as pool:
+                results = list(pool.map(fetch, urls))
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(ms for _, ms in results)
+            errors = sum(1 for ok, _ in results if not ok)
+            cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f"{level:>8}{len(results) / elapsed:>10.1f}{cuts[49]:>10.1f}{cuts[94]:>10.1f}"
+                f"{cuts[98]:>10.1f}{errors:>8}"
+            )
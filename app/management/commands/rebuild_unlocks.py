@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app.drip import schedule_course
+from app.models import Enrollment
+
+
+class Command(BaseCommand):
+    help = "Rebuild the drip unlock timelines of every enrollment from the current course outlines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help="Only rebuild enrollments in this course id.")
+
+    def handle(self, *args, **options):
+        if options['course']:
+            course_ids = [options['course']]
+        else:
+            course_ids = Enrollment.objects.order_by().values_list('course_id', flat=True).distinct()
+
+        enrollments = sum(schedule_course(course_id) for course_id in course_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {enrollments} enrollment timeline(s)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app.models import Enrollment
+from app.progress import recompute_enrollment_progress
+
+
+class Command(BaseCommand):
+    help = "Recount the completed/total lesson counters on enrollments to repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help="Only recount enrollments in this course id.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        enrollments = Enrollment.objects.all()
+        if options['course']:
+            enrollments = enrollments.filter(course_id=options['course'])
+
+        fixed = recompute_enrollment_progress(enrollments, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} enrollment(s)."))
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, F, OuterRef
+
+from app.certificates import render_certificate_by_id
+from app.models import Certificate, Enrollment
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-render certificate PDFs whose HTML changed (e.g. after editing the "
+        "certificate template). Unchanged certificates are served from the cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help="Only this course id.")
+        parser.add_argument('--workers', type=int, default=4, help="Parallel renders.")
+        parser.add_argument(
+            '--issue-missing', action='store_true',
+            help="First issue certificates for completed enrollments that don't have one.",
+        )
+
+    def handle(self, *args, **options):
+        if options['issue_missing']:
+            self.issue_missing(options['course'])
+
+        certificates = Certificate.objects.order_by('id')
+        if options['course']:
+            certificates = certificates.filter(course_id=options['course'])
+        ids = list(certificates.values_list('id', flat=True))
+
+        rendered = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(render_certificate_by_id, certificate_id) for certificate_id in ids]
+            for done, future in enumerate(futures, 1):
+                try:
+                    rendered += future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"certificate {ids[done - 1]}: {exc}")
+                if done % 100 == 0:
+                    self.stdout.write(f"{done}/{len(ids)} checked, {rendered} rendered")
+
+        style = self.style.ERROR if failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Checked {len(ids)} certificate(s): {rendered} rendered, "
+            f"{len(ids) - rendered - failed} already cached, {failed} failed."
+        ))
+
+    def issue_missing(self, course_id):
+        issued = Certificate.objects.filter(student=OuterRef('student'), course=OuterRef('course'))
+        enrollments = Enrollment.objects.filter(
+            total_lessons__gt=0, completed_lessons__gte=F('total_lessons'),
+        ).exclude(Exists(issued))
+        if course_id:
+            enrollments = enrollments.filter(course_id=course_id)
+        missing = [
+            Certificate(student_id=student_id, course_id=course_id)
+            for student_id, course_id in enrollments.values_list('student_id', 'course_id')
+        ]
+        Certificate.objects.bulk_create(missing, ignore_conflicts=True)
+        self.stdout.write(f"Issued {len(missing)} missing certificate(s).")
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Enrollment = apps.get_model('app', 'Enrollment')
+    Lesson = apps.get_model('app', 'Lesson')
+    StudentProgress = apps.get_model('app', 'StudentProgress')
+
+    lesson_total = (
+        Lesson.objects.filter(module__course=OuterRef('course'))
+        .order_by().values('module__course').annotate(n=Count('id')).values('n')
+    )
+    lesson_done = (
+        StudentProgress.objects.filter(
+            student=OuterRef('student'), lesson__module__course=OuterRef('course'), completed=True,
+        )
+        .order_by().values('student').annotate(n=Count('id')).values('n')
+    )
+    Enrollment.objects.update(
+        total_lessons=Coalesce(Subquery(lesson_total), 0),
+        completed_lessons=Coalesce(Subquery(lesson_done), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_user_balance_user_stripe_account_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='total_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:40
+
+from django.db import migrations
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def dedupe_progress(apps, schema_editor):
+    """Collapse duplicate (student, lesson) rows ahead of the unique constraint.
+
+    The oldest row survives and is marked completed if any duplicate was.
+    """
+    StudentProgress = apps.get_model('app', 'StudentProgress')
+    Enrollment = apps.get_model('app', 'Enrollment')
+
+    duplicates = (
+        StudentProgress.objects.order_by()
+        .values('student_id', 'lesson_id')
+        .annotate(n=Count('id'), keep_id=Min('id'), n_completed=Count('id', filter=Q(completed=True)))
+        .filter(n__gt=1)
+    )
+    affected_students = set()
+    for row in list(duplicates):
+        StudentProgress.objects.filter(
+            student_id=row['student_id'], lesson_id=row['lesson_id'],
+        ).exclude(id=row['keep_id']).delete()
+        if row['n_completed']:
+            StudentProgress.objects.filter(id=row['keep_id']).update(completed=True)
+        affected_students.add(row['student_id'])
+
+    if not affected_students:
+        return
+
+    # Duplicates were double counted by the counter backfill
+    lesson_done = (
+        StudentProgress.objects.filter(
+            student=OuterRef('student'), lesson__module__course=OuterRef('course'), completed=True,
+        )
+        .order_by().values('student').annotate(n=Count('id')).values('n')
+    )
+    Enrollment.objects.filter(student_id__in=affected_students).update(
+        completed_lessons=Coalesce(Subquery(lesson_done), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_enrollment_progress_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_progress, migrations.RunPython.noop),
+    ]
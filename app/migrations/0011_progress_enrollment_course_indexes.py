@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:22
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_dedupe_student_progress'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(django.db.models.functions.text.Lower('category'), name='course_category_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['category'], name='course_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['course_type', 'is_free'], name='course_type_free_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'enrolled_on'], name='enrollment_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprogress',
+            index=models.Index(fields=['student', 'completed', 'lesson'], name='progress_student_done_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentprogress',
+            constraint=models.UniqueConstraint(fields=('student', 'lesson'), name='unique_student_lesson_progress'),
+        ),
+    ]
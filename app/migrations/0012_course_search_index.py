@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:05
+
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS app_course_fts USING fts5("
+    "title, category, description, tokenize = 'porter unicode61')"
+)
+SQLITE_FILL = (
+    "INSERT INTO app_course_fts (rowid, title, category, description) "
+    "SELECT id, title, category, description FROM app_course"
+)
+POSTGRES_CREATE = (
+    "CREATE INDEX IF NOT EXISTS course_search_vector_idx ON app_course USING GIN (("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_FILL)
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_CREATE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS app_course_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS course_search_vector_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_progress_enrollment_course_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:43
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def dedupe_certificates(apps, schema_editor):
+    # Keep the first certificate issued for each (student, course)
+    Certificate = apps.get_model('app', 'Certificate')
+    duplicates = (
+        Certificate.objects.order_by()
+        .values('student_id', 'course_id')
+        .annotate(n=Count('id'), keep_id=Min('id'))
+        .filter(n__gt=1)
+    )
+    for row in list(duplicates):
+        Certificate.objects.filter(
+            student_id=row['student_id'], course_id=row['course_id'],
+        ).exclude(id=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_course_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_certificates, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='certificate',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='rendered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='certificate',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_student_course_certificate'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:07
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_timelines(apps, schema_editor):
+    # Same rules as app.drip.timeline, spelled out on the historical models
+    Enrollment = apps.get_model('app', 'Enrollment')
+    Module = apps.get_model('app', 'Module')
+    Lesson = apps.get_model('app', 'Lesson')
+    UnlockEvent = apps.get_model('app', 'UnlockEvent')
+
+    for course_id in Enrollment.objects.values_list('course_id', flat=True).distinct():
+        modules = list(Module.objects.filter(course_id=course_id).values_list('id', 'available_after_days'))
+        lessons = list(Lesson.objects.filter(module__course_id=course_id).values_list(
+            'id', 'module_id', 'available_after_days',
+        ))
+        module_days = {module_id: max(days, 0) for module_id, days in modules}
+        events = []
+        for enrollment_id, enrolled_on in Enrollment.objects.filter(course_id=course_id).values_list(
+            'id', 'enrolled_on',
+        ):
+            for module_id, days in module_days.items():
+                events.append(UnlockEvent(
+                    enrollment_id=enrollment_id, module_id=module_id,
+                    unlock_at=enrolled_on + timedelta(days=days),
+                ))
+            for lesson_id, module_id, days in lessons:
+                events.append(UnlockEvent(
+                    enrollment_id=enrollment_id, module_id=module_id, lesson_id=lesson_id,
+                    unlock_at=enrolled_on + timedelta(days=max(module_days[module_id], days)),
+                ))
+        UnlockEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_certificate_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnlockEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unlock_at', models.DateTimeField()),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unlock_events', to='app.enrollment')),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='unlock_events', to='app.lesson')),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unlock_events', to='app.module')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['enrollment', 'unlock_at'], name='unlock_enrollment_time_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('lesson__isnull', True)), fields=('enrollment', 'module'), name='unique_enrollment_module_unlock'), models.UniqueConstraint(condition=models.Q(('lesson__isnull', False)), fields=('enrollment', 'lesson'), name='unique_enrollment_lesson_unlock')],
+            },
+        ),
+        migrations.RunPython(build_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_unlock_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentprogress',
+            index=models.Index(fields=['lesson', 'completed_at'], name='progress_lesson_time_idx'),
+        ),
+    ]
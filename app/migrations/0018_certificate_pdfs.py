@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_progress_report_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificatePDF',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('pdf', models.BinaryField()),
+                ('rendered_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
 from django.utils import timezone  # ✅ Add this
 from cloudinary.models import CloudinaryField
 
@@ -13,6 +14,29 @@ from django.utils import timezone
 
 
 
+class CourseQuerySet(models.QuerySet):
+    # Columns a text-only course row needs; thmb/cover_url can hold up to
+    # 90000 chars each and description is unbounded, so they stay deferred.
+    LISTING_FIELDS = (
+        'id', 'title', 'category', 'course_type', 'price', 'is_free',
+        'is_published', 'created_at', 'updated_at', 'instructor', 'instructor__username',
+    )
+    # includes/course_card.html also shows the thumbnail and a description excerpt
+    CARD_FIELDS = LISTING_FIELDS + ('thmb', 'description')
+
+    def published(self):
+        return self.filter(is_published=True)
+
+    def newest_first(self):
+        return self.order_by('-created_at', '-id')
+
+    def for_listing(self):
+        return self.select_related('instructor').only(*self.LISTING_FIELDS).newest_first()
+
+    def for_card(self):
+        return self.select_related('instructor').only(*self.CARD_FIELDS).newest_first()
+
+
 class Course(models.Model):
     COURSE_TYPE_CHOICES = [
         ("BEGINNER", "Beginner"),
@@ -29,10 +53,24 @@ class Course(models.Model):
     description = models.TextField()
     is_published = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)  # ✅ Added created date
+    updated_at = models.DateTimeField(auto_now=True)  # Part of the course card cache key
 
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00,blank=True)
     is_free = models.BooleanField(default=False)
 
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # home filters with a case-insensitive category match
+            models.Index(Lower('category'), name='course_category_lower_idx'),
+            models.Index(fields=['category'], name='course_category_idx'),
+            models.Index(fields=['course_type', 'is_free'], name='course_type_free_idx'),
+            # Keyset pagination order for listings
+            models.Index(fields=['-created_at', '-id'], name='course_created_idx'),
+            models.Index(fields=['instructor', '-created_at', '-id'], name='course_instructor_created_idx'),
+        ]
+
 
     def __str__(self):
         return self.title
@@ -44,6 +82,9 @@ class Module(models.Model):
     order = models.PositiveIntegerField()
     available_after_days = models.IntegerField(default=0)  # Days after enrollment
 
+    def __str__(self):
+        return self.title
+
 
 class Lesson(models.Model):
     module = models.ForeignKey(Module,related_name='lessons', on_delete=models.CASCADE)
@@ -53,6 +94,9 @@ class Lesson(models.Model):
     order = models.PositiveIntegerField()
     available_after_days = models.IntegerField(default=0)  # Days after enrollment
 
+    def __str__(self):
+        return self.title
+
 
 class Quiz(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
@@ -69,6 +113,17 @@ class StudentProgress(models.Model):
     completed_at = models.DateTimeField(auto_now_add=True)
     completed = models.BooleanField(default=False,blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'lesson'], name='unique_student_lesson_progress'),
+        ]
+        indexes = [
+            # Covers the classroom's "completed lessons for this student" lookup
+            models.Index(fields=['student', 'completed', 'lesson'], name='progress_student_done_idx'),
+            # Per-lesson completion ranges for the instructor reports
+            models.Index(fields=['lesson', 'completed_at'], name='progress_lesson_time_idx'),
+        ]
+
 
 
 
@@ -77,19 +132,89 @@ class Enrollment(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     enrolled_on = models.DateTimeField(auto_now_add=True)
 
+    # Maintained by app.progress and the lesson signals; repair drift with
+    # `manage.py recompute_progress`.
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+
     class Meta:
         unique_together = ('student', 'course')  # 🚫 prevent duplicates
-    
+        indexes = [
+            models.Index(fields=['course', 'enrolled_on'], name='enrollment_course_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.total_lessons:
+            from .outline import get_course_outline
+            self.total_lessons = get_course_outline(self.course_id).lesson_count
+        super().save(*args, **kwargs)
+
+    @property
+    def progress_percent(self):
+        if not self.total_lessons:
+            return 0
+        return min(100, round(self.completed_lessons * 100 / self.total_lessons))
+
+    @property
+    def is_complete(self):
+        return self.completed_lessons >= self.total_lessons
+
     def available_modules(self):
-        now = timezone.now()
-        return self.course.modules.filter(
-            available_after_days__lte=(now - self.enrolled_on).days
-        )
+        from .drip import get_drip_state
+        return self.course.modules.filter(id__in=get_drip_state(self.id).module_ids).order_by('order', 'id')
+
+
+class UnlockEvent(models.Model):
+    """One row of an enrollment's drip timeline, written by app.drip.
+
+    Module rows have no lesson. A lesson row's unlock_at is never earlier
+    than its module's.
+    """
+    enrollment = models.ForeignKey(Enrollment, related_name='unlock_events', on_delete=models.CASCADE)
+    module = models.ForeignKey(Module, related_name='unlock_events', on_delete=models.CASCADE)
+    lesson = models.ForeignKey(Lesson, related_name='unlock_events', null=True, blank=True, on_delete=models.CASCADE)
+    unlock_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['enrollment', 'module'], condition=models.Q(lesson__isnull=True),
+                name='unique_enrollment_module_unlock',
+            ),
+            models.UniqueConstraint(
+                fields=['enrollment', 'lesson'], condition=models.Q(lesson__isnull=False),
+                name='unique_enrollment_lesson_unlock',
+            ),
+        ]
+        indexes = [
+            # "Unlocked by now" and "next unlock" are both ranges on this
+            models.Index(fields=['enrollment', 'unlock_at'], name='unlock_enrollment_time_idx'),
+        ]
 
 class Certificate(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     generated_at = models.DateTimeField(auto_now_add=True)
 
+    # sha256 of the rendered HTML; the key of its CertificatePDF (see app.certificates)
+    content_hash = models.CharField(max_length=64, blank=True)
+    rendered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_student_course_certificate'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.course.title} Certificate"
+
+
+class CertificatePDF(models.Model):
+    """A rendered certificate, keyed by the sha256 of its HTML.
+
+    Kept in the database rather than on disk so the web and worker services
+    see the same files wherever they run.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    pdf = models.BinaryField()
+    rendered_at = models.DateTimeField(auto_now_add=True)
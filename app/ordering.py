@@ -0,0 +1,91 @@
+"""Apply a whole-course module/lesson ordering in one go.
+
+The ordering is the course's full tree, modules in order, each with its
+lesson ids in order:
+
+    {"modules": [{"id": 3, "lessons": [7, 5]}, {"id": 4, "lessons": [6]}]}
+
+Positions become ``order`` values 1..n, so the result is always unique and
+gapless. A lesson listed under a different module moves there.
+"""
+from django.db import transaction
+
+from .drip import reschedule_modules
+from .models import Lesson, Module
+from .outline import get_course_outline, invalidate_course_outline
+
+
+class OrderingError(ValueError):
+    pass
+
+
+def _is_id(value):
+    # JSON true/false arrive as bools, which are ints to isinstance
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _ids(values, what):
+    if not isinstance(values, list) or not all(_is_id(value) for value in values):
+        raise OrderingError(f"{what} must be a list of ids.")
+    if len(set(values)) != len(values):
+        raise OrderingError(f"{what} lists an id more than once.")
+    return values
+
+
+def parse_ordering(payload):
+    """Validate the payload's shape; returns [(module_id, [lesson_id, ...]), ...]."""
+    if not isinstance(payload, dict) or not isinstance(payload.get('modules'), list):
+        raise OrderingError("Expected {\"modules\": [{\"id\": ..., \"lessons\": [...]}, ...]}.")
+    tree = []
+    for entry in payload['modules']:
+        if not isinstance(entry, dict) or not _is_id(entry.get('id')):
+            raise OrderingError("Every module needs an integer id.")
+        tree.append((entry['id'], _ids(entry.get('lessons', []), f"Lessons of module {entry['id']}")))
+    _ids([module_id for module_id, _ in tree], "Modules")
+    _ids([lesson_id for _, lesson_ids in tree for lesson_id in lesson_ids], "Lessons")
+    return tree
+
+
+def apply_ordering(course, payload):
+    """Reorder ``course`` to match ``payload`` and return its fresh outline.
+
+    The payload has to name every module and lesson of the course exactly
+    once. Only rows whose position or module changed are written, with one
+    bulk_update per model.
+    """
+    tree = parse_ordering(payload)
+    with transaction.atomic():
+        modules = {module.id: module for module in Module.objects.select_for_update().filter(course=course)}
+        lessons = {lesson.id: lesson for lesson in Lesson.objects.filter(module__course=course)}
+
+        if set(modules) != {module_id for module_id, _ in tree}:
+            raise OrderingError("The ordering must list every module of the course exactly once.")
+        if set(lessons) != {lesson_id for _, lesson_ids in tree for lesson_id in lesson_ids}:
+            raise OrderingError("The ordering must list every lesson of the course exactly once.")
+
+        changed_modules, changed_lessons, moved_to = [], [], set()
+        for position, (module_id, lesson_ids) in enumerate(tree, 1):
+            module = modules[module_id]
+            if module.order != position:
+                module.order = position
+                changed_modules.append(module)
+            for lesson_position, lesson_id in enumerate(lesson_ids, 1):
+                lesson = lessons[lesson_id]
+                if lesson.order != lesson_position or lesson.module_id != module_id:
+                    if lesson.module_id != module_id:
+                        moved_to.add(module_id)
+                    lesson.order = lesson_position
+                    lesson.module_id = module_id
+                    changed_lessons.append(lesson)
+
+        Module.objects.bulk_update(changed_modules, ['order'])
+        Lesson.objects.bulk_update(changed_lessons, ['order', 'module'])
+
+        # bulk_update skips the signals that keep these in sync
+        if changed_modules or changed_lessons:
+            invalidate_course_outline(course.id)
+            transaction.on_commit(lambda: invalidate_course_outline(course.id))
+        if moved_to:
+            # A lesson's unlock time depends on its module's
+            reschedule_modules(course.id, moved_to)
+    return get_course_outline(course.id)
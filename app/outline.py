@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from .models import Lesson, Module
+
+# Bump when the shape of the cached objects changes so old pickles are ignored
+OUTLINE_VERSION = 1
+OUTLINE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class OutlineLesson:
+    id: int
+    title: str
+    order: int
+    available_after_days: int
+
+
+@dataclass(frozen=True)
+class OutlineModule:
+    id: int
+    title: str
+    order: int
+    available_after_days: int
+    lessons: tuple
+
+
+@dataclass(frozen=True)
+class CourseOutline:
+    course_id: int
+    modules: tuple
+
+    @property
+    def module_count(self):
+        return len(self.modules)
+
+    @property
+    def lesson_count(self):
+        return sum(len(module.lessons) for module in self.modules)
+
+    @property
+    def lessons(self):
+        return [lesson for module in self.modules for lesson in module.lessons]
+
+
+def outline_cache_key(course_id):
+    return f"course_outline:v{OUTLINE_VERSION}:{course_id}"
+
+
+def _lesson_rows(course_id):
+    return (
+        Lesson.objects.filter(module__course_id=course_id)
+        .order_by('order', 'id')
+        .values_list('id', 'module_id', 'title', 'order', 'available_after_days')
+    )
+
+
+def _module_rows(course_id):
+    return (
+        Module.objects.filter(course_id=course_id)
+        .order_by('order', 'id')
+        .values_list('id', 'title', 'order', 'available_after_days')
+    )
+
+
+def _assemble_outline(course_id, lesson_rows, module_rows):
+    lessons_by_module = {}
+    for lesson_id, module_id, title, order, days in lesson_rows:
+        lessons_by_module.setdefault(module_id, []).append(
+            OutlineLesson(lesson_id, title, order, days)
+        )
+
+    modules = tuple(
+        OutlineModule(module_id, title, order, days, tuple(lessons_by_module.get(module_id, ())))
+        for module_id, title, order, days in module_rows
+    )
+    return CourseOutline(course_id=course_id, modules=modules)
+
+
+def build_course_outline(course_id):
+    return _assemble_outline(course_id, _lesson_rows(course_id), _module_rows(course_id))
+
+
+async def abuild_course_outline(course_id):
+    lesson_rows = [row async for row in _lesson_rows(course_id)]
+    module_rows = [row async for row in _module_rows(course_id)]
+    return _assemble_outline(course_id, lesson_rows, module_rows)
+
+
+def get_course_outline(course_id):
+    """Return the ordered module/lesson tree for a course, cached until it changes."""
+    key = outline_cache_key(course_id)
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_course_outline(course_id)
+        cache.set(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+
+async def aget_course_outline(course_id):
+    key = outline_cache_key(course_id)
+    outline = await cache.aget(key)
+    if outline is None:
+        outline = await abuild_course_outline(course_id)
+        await cache.aset(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+
+def invalidate_course_outline(course_id):
+    cache.delete(outline_cache_key(course_id))
@@ -0,0 +1,220 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def _json_default(value):
+    # Full isoformat: DjangoJSONEncoder drops microseconds, which would make
+    # created_at keys ambiguous.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_token(payload):
+    raw = json.dumps(payload, default=_json_default, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidToken(token) from exc
+    if not isinstance(payload, dict):
+        raise InvalidToken(token)
+    return payload
+
+
+def approximate_count(queryset, cap=1000):
+    """Cheap row estimate for "about N results" labels.
+
+    Postgres answers from the planner's estimate. Elsewhere this counts at
+    most ``cap + 1`` rows so it never scans the whole table; anything above
+    ``cap`` just means "more than cap".
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    return queryset.order_by()[:cap + 1].count()
+
+
+async def aapproximate_count(queryset, cap=1000):
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(await queryset.order_by().aexplain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    return await queryset.order_by()[:cap + 1].acount()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists over tables with millions of rows.
+
+    On Postgres, results up to ``exact_limit`` rows are counted exactly and
+    bigger ones use the planner's estimate, so no page ever runs a full
+    COUNT(*). Other backends count exactly.
+    """
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().count
+        bounded = queryset.order_by()[:self.exact_limit].count()
+        if bounded < self.exact_limit:
+            return bounded
+        return max(approximate_count(queryset), bounded)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_token=None, previous_token=None, approximate_total=None, total_cap=None):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.previous_token = previous_token
+        self.approximate_total = approximate_total
+        # Set when approximate_total was counted only up to this many rows
+        self.total_cap = total_cap
+
+    @property
+    def total_is_capped(self):
+        return self.total_cap is not None and self.approximate_total > self.total_cap
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """Cursor pagination over a unique ordering, (-created_at, -id) by default.
+
+    Every page is one indexed range query, so page 500 costs what page 1
+    does. Tokens are opaque; a bad or stale one falls back to the first page.
+    """
+    total_cap = 1000
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), with_total=False):
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) != 1:
+            raise ValueError("Keyset ordering must be all ascending or all descending.")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.descending = descending.pop()
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.with_total = with_total
+
+    def get_page(self, token=None):
+        keys, backwards, queryset = self._page_query(token)
+        rows = list(queryset)
+        if backwards and len(rows) <= self.per_page:
+            # Walked back to the start; serve a full first page instead of a short one
+            return self.get_page()
+        total = approximate_count(self.queryset, self.total_cap) if self.with_total else None
+        return self._page(rows, keys, backwards, total)
+
+    async def aget_page(self, token=None):
+        keys, backwards, queryset = self._page_query(token)
+        rows = [row async for row in queryset]
+        if backwards and len(rows) <= self.per_page:
+            return await self.aget_page()
+        total = await aapproximate_count(self.queryset, self.total_cap) if self.with_total else None
+        return self._page(rows, keys, backwards, total)
+
+    def _page_query(self, token):
+        try:
+            payload = decode_token(token) if token else {}
+            keys = self._keys_from(payload)
+        except InvalidToken:
+            payload, keys = {}, None
+        backwards = keys is not None and payload.get('d') == 'prev'
+
+        queryset = self.queryset
+        if keys is not None:
+            queryset = queryset.filter(self._seek(keys, backwards))
+        ordering = self._reversed() if backwards else self.ordering
+        return keys, backwards, queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def _page(self, rows, keys, backwards, total):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = keys is not None, more
+
+        return KeysetPage(
+            rows,
+            next_token=self._token(rows[-1], 'next') if has_next and rows else None,
+            previous_token=self._token(rows[0], 'prev') if has_previous and rows else None,
+            approximate_total=total,
+            # Postgres totals are planner estimates, not capped counts
+            total_cap=None if connections[self.queryset.db].vendor == 'postgresql' else self.total_cap,
+        )
+
+    def _keys_from(self, payload):
+        if 'k' not in payload:
+            return None
+        values = payload['k']
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidToken(payload)
+        model = self.queryset.model
+        try:
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except Exception as exc:
+            raise InvalidToken(payload) from exc
+
+    def _seek(self, keys, backwards):
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y), spelled out so it
+        # works on every backend and still uses the composite index.
+        lookup = 'gt' if self.descending == backwards else 'lt'
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            step = Q(**{f'{field}__{lookup}': keys[i]})
+            for prior, value in zip(self.fields[:i], keys[:i]):
+                step &= Q(**{prior: value})
+            condition |= step
+        return condition
+
+    def _reversed(self):
+        return tuple(field[1:] if field.startswith('-') else '-' + field for field in self.ordering)
+
+    def _token(self, obj, direction):
+        return encode_token({'k': [getattr(obj, field) for field in self.fields], 'd': direction})
+
+
+def paginate_sequence(items, per_page, token=None):
+    """Page an already bounded, pre-ordered list (e.g. ranked search hits)."""
+    try:
+        offset = int(decode_token(token).get('o', 0)) if token else 0
+    except (InvalidToken, TypeError, ValueError):
+        offset = 0
+    offset = max(0, min(offset, len(items)))
+    rows = items[offset:offset + per_page]
+    return KeysetPage(
+        rows,
+        next_token=encode_token({'o': offset + per_page}) if offset + per_page < len(items) else None,
+        previous_token=encode_token({'o': max(0, offset - per_page)}) if offset > 0 else None,
+        approximate_total=len(items),
+    )
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .certificates import issue_certificate
+from .models import Enrollment, Lesson, StudentProgress
+
+
+def complete_lesson(student, lesson):
+    """Mark ``lesson`` complete for ``student`` and bump their enrollment counter.
+
+    Completing the last lesson issues the course certificate. Returns True
+    if this call flipped the lesson to completed.
+    """
+    with transaction.atomic():
+        progress, created = StudentProgress.objects.get_or_create(student=student, lesson=lesson)
+        # Conditional update so two concurrent clicks only count once
+        flipped = StudentProgress.objects.filter(pk=progress.pk, completed=False).update(completed=True)
+        if flipped:
+            enrollments = Enrollment.objects.filter(student=student, course_id=lesson.module.course_id)
+            enrollments.update(completed_lessons=F('completed_lessons') + 1)
+            enrollment = enrollments.only('completed_lessons', 'total_lessons').first()
+            if enrollment and enrollment.is_complete:
+                issue_certificate(student, lesson.module.course_id)
+    return bool(flipped)
+
+
+def lesson_added(course_id):
+    Enrollment.objects.filter(course_id=course_id).update(total_lessons=F('total_lessons') + 1)
+
+
+def lesson_removed(course_id, lesson):
+    completed_by = StudentProgress.objects.filter(lesson=lesson, completed=True).values('student')
+    Enrollment.objects.filter(course_id=course_id, student__in=completed_by).update(
+        completed_lessons=Greatest(F('completed_lessons') - 1, 0)
+    )
+    Enrollment.objects.filter(course_id=course_id).update(
+        total_lessons=Greatest(F('total_lessons') - 1, 0)
+    )
+
+
+def recompute_enrollment_progress(enrollments=None, batch_size=1000):
+    """Recount both counters from scratch. Returns the number of rows fixed."""
+    if enrollments is None:
+        enrollments = Enrollment.objects.all()
+
+    lesson_total = (
+        Lesson.objects.filter(module__course=OuterRef('course'))
+        .order_by()
+        .values('module__course')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    lesson_done = (
+        StudentProgress.objects.filter(
+            student=OuterRef('student'),
+            lesson__module__course=OuterRef('course'),
+            completed=True,
+        )
+        .order_by()
+        .values('student')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    rows = (
+        enrollments.annotate(
+            actual_total=Coalesce(Subquery(lesson_total), 0),
+            actual_done=Coalesce(Subquery(lesson_done), 0),
+        )
+        .only('id', 'total_lessons', 'completed_lessons')
+        .iterator(chunk_size=batch_size)
+    )
+
+    fixed = 0
+    pending = []
+    for enrollment in rows:
+        if (enrollment.total_lessons, enrollment.completed_lessons) == (
+            enrollment.actual_total,
+            enrollment.actual_done,
+        ):
+            continue
+        enrollment.total_lessons = enrollment.actual_total
+        enrollment.completed_lessons = enrollment.actual_done
+        pending.append(enrollment)
+        if len(pending) >= batch_size:
+            Enrollment.objects.bulk_update(pending, ['total_lessons', 'completed_lessons'])
+            fixed += len(pending)
+            pending = []
+    if pending:
+        Enrollment.objects.bulk_update(pending, ['total_lessons', 'completed_lessons'])
+        fixed += len(pending)
+    return fixed
@@ -0,0 +1,79 @@
+"""CSV reports of an instructor's enrollments and lesson completions.
+
+Rows come from values_list(...).iterator(), so a report streams straight
+from the database cursor to the response and memory stays flat no matter
+how many rows an instructor has.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .course_io import EchoBuffer
+from .models import Enrollment, StudentProgress
+
+CHUNK_SIZE = 2000
+
+
+def date_range_filter(field, start=None, end=None):
+    """Lookups for ``start <= field < end + 1 day``, both dates optional."""
+    lookups = {}
+    if start:
+        lookups[f'{field}__gte'] = timezone.make_aware(datetime.combine(start, time.min))
+    if end:
+        lookups[f'{field}__lt'] = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    return lookups
+
+
+def enrollment_rows(instructor, start=None, end=None, course=None):
+    enrollments = Enrollment.objects.filter(course__instructor=instructor, **date_range_filter('enrolled_on', start, end))
+    if course is not None:
+        enrollments = enrollments.filter(course=course)
+    rows = (
+        enrollments.order_by('course_id', 'enrolled_on', 'id')
+        .values_list(
+            'course_id', 'course__title', 'student__username', 'student__email', 'enrolled_on',
+            'completed_lessons', 'total_lessons',
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for *row, completed, total in rows:
+        percent = min(100, round(completed * 100 / total)) if total else 0
+        yield (*row, completed, total, percent)
+
+
+def progress_rows(instructor, start=None, end=None, course=None):
+    completions = StudentProgress.objects.filter(
+        lesson__module__course__instructor=instructor, completed=True,
+        **date_range_filter('completed_at', start, end),
+    )
+    if course is not None:
+        completions = completions.filter(lesson__module__course=course)
+    return (
+        completions.order_by('completed_at', 'id')
+        .values_list(
+            'lesson__module__course_id', 'lesson__module__course__title', 'lesson__module__title',
+            'lesson_id', 'lesson__title', 'student__username', 'completed_at',
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+REPORTS = {
+    'enrollments': (
+        ('course_id', 'course', 'student', 'email', 'enrolled_on', 'completed_lessons', 'total_lessons',
+         'progress_percent'),
+        enrollment_rows,
+    ),
+    'progress': (
+        ('course_id', 'course', 'module', 'lesson_id', 'lesson', 'student', 'completed_at'),
+        progress_rows,
+    ),
+}
+
+
+def write_report(header, rows):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
@@ -0,0 +1,189 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Course
+
+FTS_TABLE = 'app_course_fts'
+
+# Control characters can't appear in course text, so they're safe markers
+# for the database to wrap matches in before we HTML-escape the snippet.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    course_id: int
+    rank: float
+    snippet: str = ''
+
+
+def highlight(snippet):
+    """Escape a raw snippet and turn the match markers into <mark> tags."""
+    html = escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+    return mark_safe(html)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+class SearchBackend:
+    """Ranked course search. Subclasses keep their index in sync with Course.
+
+    ``within`` is an optional Course queryset the matches must belong to. It
+    is applied before the limit, so filters don't shrink the ranked list.
+    """
+
+    def search(self, query, limit=None, within=None):
+        raise NotImplementedError
+
+    def index_course(self, course):
+        pass
+
+    def remove_course(self, course_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def _limit(self, limit):
+        return limit or getattr(settings, 'COURSE_SEARCH_LIMIT', 500)
+
+    def _within(self, column, within):
+        """SQL and params restricting ``column`` to the ids in ``within``."""
+        if within is None or not within.query.has_filters():
+            return '', []
+        sql, params = within.order_by().values('pk').query.sql_with_params()
+        return f' AND {column} IN ({sql})', list(params)
+
+
+class SimpleSearchBackend(SearchBackend):
+    """LIKE-based fallback for databases without a full-text engine."""
+
+    def search(self, query, limit=None, within=None):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term) | Q(description__icontains=term) | Q(category__icontains=term)
+            )
+        courses = Course.objects.all() if within is None else within
+        ids = courses.filter(condition).order_by('-created_at').values_list('id', flat=True)
+        return [SearchHit(course_id, rank=0.0) for course_id in ids[:self._limit(limit)]]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table keyed by course id, ranked with bm25."""
+
+    def search(self, query, limit=None, within=None):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        # Quote every term so user input can't inject FTS5 query syntax, and
+        # prefix-match the terms so partially typed words still hit.
+        match = ' '.join('"%s"*' % term for term in terms)
+        within_sql, within_params = self._within('rowid', within)
+        sql = (
+            f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 5.0, 1.0) AS rank, "
+            f"snippet({FTS_TABLE}, 2, %s, %s, '…', 16) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s{within_sql} ORDER BY rank LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [MATCH_START, MATCH_END, match, *within_params, self._limit(limit)])
+            return [SearchHit(row[0], row[1], row[2]) for row in cursor.fetchall()]
+
+    def index_course(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, category, description) VALUES (%s, %s, %s, %s)",
+                [course.id, course.title, course.category, course.description],
+            )
+
+    def remove_course(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [course_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, category, description) "
+                f"SELECT id, title, category, description FROM {Course._meta.db_table}"
+            )
+
+
+# Must match the expression the GIN index in migration 0012 was built on
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector search over an expression index, so there's nothing to sync."""
+
+    def search(self, query, limit=None, within=None):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        tsquery = ' & '.join('%s:*' % term for term in terms)
+        options = f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=20, MinWords=8'
+        within_sql, within_params = self._within('id', within)
+        sql = (
+            f"SELECT id, ts_rank({POSTGRES_VECTOR}, q) AS rank, "
+            f"ts_headline('english', description, q, %s) "
+            f"FROM {Course._meta.db_table}, to_tsquery('english', %s) q "
+            f"WHERE {POSTGRES_VECTOR} @@ q{within_sql} ORDER BY rank DESC LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [options, tsquery, *within_params, self._limit(limit)])
+            return [SearchHit(row[0], row[1], row[2]) for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    path = getattr(settings, 'COURSE_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return BACKENDS.get(connection.vendor, SimpleSearchBackend)()
+
+
+def search_courses(query, courses=None, limit=None):
+    """Return courses matching ``query`` in rank order, each with a ``search_snippet``.
+
+    ``courses`` narrows the results to an already filtered queryset; its
+    filters go into the search query, so the limit counts only courses that
+    pass them. The result is a list capped at the backend's limit.
+    """
+    hits = get_search_backend().search(query, limit, within=courses)
+    if not hits:
+        return []
+    if courses is None:
+        courses = Course.objects.all()
+    matched = courses.in_bulk([hit.course_id for hit in hits])
+    results = []
+    for hit in hits:
+        course = matched.get(hit.course_id)
+        if course is None:
+            continue
+        course.search_snippet = highlight(hit.snippet) if hit.snippet else ''
+        results.append(course)
+    return results
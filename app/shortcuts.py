@@ -0,0 +1,36 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+
+# Chunks handed from the sync thread to the event loop at a time
+STREAM_BATCH = 200
+
+# For async views. Templates can still touch lazy objects such as
+# request.user, so they render on the request's sync thread instead of
+# the event loop.
+arender = sync_to_async(render)
+
+
+async def aiter_batches(iterator, size=STREAM_BATCH):
+    """Drain a sync iterator from the event loop, ``size`` items per thread hop."""
+    next_batch = sync_to_async(lambda: list(islice(iterator, size)))
+    while batch := await next_batch():
+        for item in batch:
+            yield item
+
+
+def download_response(chunks, content_type, filename):
+    """Stream a sync generator of chunks as a file download.
+
+    Under ASGI, Django reads a sync iterator with sync_to_async(list), which
+    holds the whole file in memory. There the chunks go through
+    aiter_batches instead, so memory stays bounded under either server.
+    """
+    if getattr(settings, 'SERVING_ASGI', False):
+        chunks = aiter_batches(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import progress
+from .caching import bump_catalog_generation
+from .drip import reschedule_modules, schedule_enrollment
+from .models import Course, Enrollment, Lesson, Module
+from .outline import invalidate_course_outline
+from .search import get_search_backend
+
+
+def _deleted_with(origin, *models):
+    # ``origin`` is the instance or queryset .delete() was called on
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in models
+
+
+# The fields an unlock time is computed from
+SCHEDULE_FIELDS = {
+    Module: ('available_after_days',),
+    Lesson: ('available_after_days', 'module_id'),
+}
+
+
+def _invalidate_outline(course_id):
+    # Drop it now and again after commit, so a request that re-cached the
+    # old tree while the transaction was open doesn't keep it alive.
+    invalidate_course_outline(course_id)
+    transaction.on_commit(lambda: invalidate_course_outline(course_id))
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, **kwargs):
+    get_search_backend().index_course(instance)
+    bump_catalog_generation()
+    _invalidate_outline(instance.id)
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    get_search_backend().remove_course(instance.id)
+    bump_catalog_generation()
+    _invalidate_outline(instance.id)
+
+
+@receiver(pre_save, sender=Module)
+@receiver(pre_save, sender=Lesson)
+def note_schedule_change(sender, instance, update_fields, **kwargs):
+    # Most edits (titles, notes, order) don't move any unlock times
+    fields = SCHEDULE_FIELDS[sender]
+    if instance._state.adding:
+        instance._schedule_changed = True
+    elif update_fields is not None and not {*fields, *(field.removesuffix('_id') for field in fields)} & update_fields:
+        instance._schedule_changed = False
+    else:
+        saved = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+        instance._schedule_changed = saved != tuple(getattr(instance, field) for field in fields)
+
+
+@receiver(post_save, sender=Module)
+def module_saved(sender, instance, **kwargs):
+    _invalidate_outline(instance.course_id)
+    if instance._schedule_changed:
+        reschedule_modules(instance.course_id, [instance.id])
+
+
+@receiver(post_delete, sender=Module)
+def module_deleted(sender, instance, origin, **kwargs):
+    # Its unlock events go with it on the cascade
+    _invalidate_outline(instance.course_id)
+    if not _deleted_with(origin, Course):
+        # Its lessons skipped their own bookkeeping; recount the course once
+        progress.recompute_enrollment_progress(Enrollment.objects.filter(course_id=instance.course_id))
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, **kwargs):
+    course_id = instance.module.course_id
+    if created:
+        progress.lesson_added(course_id)
+    _invalidate_outline(course_id)
+    if instance._schedule_changed:
+        reschedule_modules(course_id, [instance.module_id])
+
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_deleted(sender, instance, origin, **kwargs):
+    if not _deleted_with(origin, Lesson):
+        # Part of a module or course cascade: module_deleted recounts once,
+        # and a deleted course takes its enrollments with it
+        return
+    # The progress rows are gone by post_delete, so settle up front
+    course_id = Module.objects.filter(id=instance.module_id).values_list('course_id', flat=True).first()
+    if course_id is not None:
+        progress.lesson_removed(course_id, instance)
+        _invalidate_outline(course_id)
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, **kwargs):
+    if created:
+        schedule_enrollment(instance)
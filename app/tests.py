@@ -1,3 +1,578 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.worker import claim, execute
+
+from .certificates import render_certificate
+from .course_io import FORMATS, PackageError, export_records, import_package, read_jsonl, write_jsonl
+from .drip import build_drip_state, get_drip_state
+from .models import (
+    Certificate, CertificatePDF, Course, Enrollment, Lesson, Module, StudentProgress, UnlockEvent, User,
+)
+from .ordering import apply_ordering
+from .outline import get_course_outline, outline_cache_key
+from .pagination import EstimatedCountPaginator, KeysetPaginator
+from .progress import complete_lesson, recompute_enrollment_progress
+from .search import search_courses
+from .shortcuts import STREAM_BATCH, download_response
+
+
+class DripScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', instructor=self.instructor, description='d')
+        self.first = Module.objects.create(course=self.course, title='First', order=1)
+        self.second = Module.objects.create(course=self.course, title='Second', order=2, available_after_days=7)
+        self.intro = Lesson.objects.create(module=self.first, title='Intro', order=1)
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+
+    def test_lesson_added_after_enrolling_is_unlocked_at_once(self):
+        get_drip_state(self.enrollment.id)  # cached before the edit
+        lesson = Lesson.objects.create(module=self.first, title='New', order=2)
+
+        self.assertIn(lesson.id, get_drip_state(self.enrollment.id).lesson_ids)
+        self.client.force_login(self.student)
+        self.client.get(reverse('mark_lesson_complete', args=[self.course.id, self.intro.id]))
+        self.client.get(reverse('mark_lesson_complete', args=[self.course.id, lesson.id]))
+        self.assertTrue(StudentProgress.objects.filter(lesson=lesson, completed=True).exists())
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.total_lessons), (2, 2))
+
+    def test_edited_lesson_moves_its_unlock(self):
+        self.intro.available_after_days = 3
+        self.intro.save()
+        self.assertNotIn(self.intro.id, get_drip_state(self.enrollment.id).lesson_ids)
+        event = UnlockEvent.objects.get(enrollment=self.enrollment, lesson=self.intro)
+        self.assertEqual(event.unlock_at, self.enrollment.enrolled_on + timedelta(days=3))
+
+    def test_module_edit_reschedules_its_lessons(self):
+        later = Lesson.objects.create(module=self.second, title='Later', order=1)
+        self.assertNotIn(later.id, get_drip_state(self.enrollment.id).lesson_ids)
+        self.second.available_after_days = 0
+        self.second.save()
+        state = get_drip_state(self.enrollment.id)
+        self.assertIn(self.second.id, state.module_ids)
+        self.assertIn(later.id, state.lesson_ids)
+
+    def test_edits_that_keep_the_schedule_write_no_events(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.intro.title = 'Welcome'
+            self.intro.save()
+            self.second.title = 'Later on'
+            self.second.save(update_fields=['title'])
+        self.assertFalse([q for q in queries if 'app_unlockevent' in q['sql']])
+
+    @mock.patch('app.drip.INLINE_SCHEDULE_LIMIT', 0)
+    def test_big_courses_are_rescheduled_by_the_worker(self):
+        self.intro.available_after_days = 3
+        self.intro.save()
+        self.first.available_after_days = 1
+        self.first.save()
+        event = UnlockEvent.objects.get(enrollment=self.enrollment, lesson=self.intro)
+        self.assertEqual(event.unlock_at, self.enrollment.enrolled_on)
+
+        [queued] = Task.objects.all()
+        self.assertEqual((queued.name, queued.args), ('app.drip.schedule_course', [self.course.id]))
+        self.assertTrue(execute(claim('test', 1)[0]))
+        event = UnlockEvent.objects.get(enrollment=self.enrollment, lesson=self.intro)
+        self.assertEqual(event.unlock_at, self.enrollment.enrolled_on + timedelta(days=3))
+
+    def test_reordering_moves_a_lesson_into_a_locked_module(self):
+        apply_ordering(self.course, {'modules': [
+            {'id': self.first.id, 'lessons': []},
+            {'id': self.second.id, 'lessons': [self.intro.id]},
+        ]})
+        self.assertNotIn(self.intro.id, get_drip_state(self.enrollment.id).lesson_ids)
+        self.assertEqual(UnlockEvent.objects.filter(lesson=self.intro).count(), 1)
+        week_later = build_drip_state(self.enrollment.id, now=self.enrollment.enrolled_on + timedelta(days=7))
+        self.assertIn(self.intro.id, week_later.lesson_ids)
+
+
+@mock.patch('app.certificates.render_pdf', side_effect=lambda html: b'%PDF-1.7 ' + html.encode()[:20])
+class CertificateDownloadTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', instructor=instructor, description='d')
+        module = Module.objects.create(course=self.course, title='Only', order=1)
+        Lesson.objects.create(module=module, title='Only', order=1)
+        Enrollment.objects.create(student=self.student, course=self.course, completed_lessons=1)
+        self.url = reverse('generate_certificate', args=[self.course.id])
+        self.client.force_login(self.student)
+
+    def test_pending_until_rendered_then_served_from_the_database(self, render_pdf):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+
+        certificate = Certificate.objects.select_related('student', 'course').get()
+        self.assertTrue(render_certificate(certificate))
+        self.assertFalse(render_certificate(certificate))
+        self.assertEqual(CertificatePDF.objects.count(), 1)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF-1.7'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        for number in range(3):
+            Course.objects.create(title=f'Python {number}', instructor=instructor, description='python python')
+        self.advanced = Course.objects.create(
+            title='Advanced', instructor=instructor, description='python', course_type='ADVANCED',
+        )
+
+    def test_filters_apply_before_the_limit(self):
+        advanced = Course.objects.filter(course_type='ADVANCED')
+        self.assertEqual(search_courses('python', advanced, limit=1), [self.advanced])
+        self.assertNotIn(self.advanced, search_courses('python', limit=1))
+
+
+class LessonDeletionTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.course = Course.objects.create(title='Course', instructor=instructor, description='d')
+        self.modules = [Module.objects.create(course=self.course, title=f'M{n}', order=n) for n in (1, 2)]
+        self.lessons = [
+            Lesson.objects.create(module=module, title=f'L{n}', order=n)
+            for module in self.modules for n in (1, 2)
+        ]
+        self.students = [User.objects.create_user(f'student{n}', password='pw') for n in (1, 2)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        # The first student finished the first module, the second one lesson of each
+        for student, lessons in zip(self.students, (self.lessons[:2], self.lessons[::2])):
+            for lesson in lessons:
+                StudentProgress.objects.create(student=student, lesson=lesson, completed=True)
+        Enrollment.objects.filter(course=self.course).update(completed_lessons=2)
+
+    def counters(self):
+        return list(Enrollment.objects.order_by('student_id').values_list('completed_lessons', 'total_lessons'))
+
+    def test_deleting_a_lesson(self):
+        self.lessons[0].delete()
+        self.assertEqual(self.counters(), [(1, 3), (1, 3)])
+
+    def test_deleting_a_module_recounts_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.modules[0].delete()
+        self.assertEqual(self.counters(), [(0, 2), (1, 2)])
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "app_enrollment"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_deleting_a_course_skips_the_counters(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.course.delete()
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "app_enrollment"')])
+
+
+@mock.patch.object(KeysetPaginator, 'total_cap', 3)
+class CourseTotalTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        for number in range(3):
+            Course.objects.create(title=f'Course {number}', instructor=instructor, description='d')
+
+    def test_total_below_the_cap_is_exact(self):
+        page = KeysetPaginator(Course.objects.all(), 2, with_total=True).get_page()
+        self.assertEqual((page.approximate_total, page.total_is_capped), (3, False))
+
+    def test_total_above_the_cap_is_shown_as_a_lower_bound(self):
+        Course.objects.create(title='One more', instructor=User.objects.get(), description='d')
+        page = KeysetPaginator(Course.objects.all(), 2, with_total=True).get_page()
+        self.assertTrue(page.total_is_capped)
+        response = self.client.get(reverse('all_courses'))
+        self.assertContains(response, '3+ courses')
+        self.assertNotContains(response, 'About 4')
+
+
+class DownloadResponseTests(SimpleTestCase):
+    def setUp(self):
+        self.pulled = 0
+
+    def chunks(self):
+        for number in range(STREAM_BATCH * 3):
+            self.pulled += 1
+            yield f'{number}\n'
+
+    def test_wsgi_streams_the_generator_itself(self):
+        response = download_response(self.chunks(), 'text/csv', 'report.csv')
+        self.assertFalse(response.is_async)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="report.csv"')
+
+    @override_settings(SERVING_ASGI=True)
+    async def test_asgi_streams_in_batches_instead_of_buffering(self):
+        response = download_response(self.chunks(), 'text/csv', 'report.csv')
+        self.assertTrue(response.is_async)
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'0\n')
+        self.assertEqual(self.pulled, STREAM_BATCH)
+        self.assertEqual(len([chunk async for chunk in stream]), STREAM_BATCH * 3 - 1)
+
+
+class ClassroomTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.student = User.objects.create_user('student', password='pw')
+        self.client.force_login(self.student)
+
+    def course_with(self, modules, lessons_per_module):
+        course = Course.objects.create(title=f'{modules}x{lessons_per_module}', instructor=self.instructor, description='d')
+        for m in range(modules):
+            module = Module.objects.create(course=course, title=f'M{m}', order=m)
+            for n in range(lessons_per_module):
+                lesson = Lesson.objects.create(module=module, title=f'L{m}.{n}', order=n)
+        Enrollment.objects.create(student=self.student, course=course)
+        StudentProgress.objects.create(student=self.student, lesson=lesson, completed=True)
+        return course
+
+    def classroom_queries(self, course):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('classroom_view', args=[course.id]))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_the_course(self):
+        small, small_queries = self.classroom_queries(self.course_with(1, 1))
+        large, large_queries = self.classroom_queries(self.course_with(5, 6))
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(len(large.context['modules']), 5)
+        self.assertEqual(len(large.context['completed_lessons']), 1)
+
+    def test_students_who_are_not_enrolled_are_sent_home(self):
+        course = Course.objects.create(title='Other', instructor=self.instructor, description='d')
+        self.assertRedirects(
+            self.client.get(reverse('classroom_view', args=[course.id])), reverse('home'), fetch_redirect_response=False,
+        )
+
+
+class CourseOutlineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.course = Course.objects.create(title='Course', instructor=instructor, description='d')
+        self.module = Module.objects.create(course=self.course, title='First', order=1)
+        self.lesson = Lesson.objects.create(module=self.module, title='Intro', order=1)
+
+    def titles(self):
+        return [
+            (module.title, [lesson.title for lesson in module.lessons])
+            for module in get_course_outline(self.course.id).modules
+        ]
+
+    def test_second_read_comes_from_the_cache(self):
+        self.assertEqual(self.titles(), [('First', ['Intro'])])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), [('First', ['Intro'])])
+
+    def test_edits_invalidate_the_outline(self):
+        self.titles()
+        self.lesson.title = 'Welcome'
+        self.lesson.save()
+        Lesson.objects.create(module=self.module, title='Next', order=2)
+        second = Module.objects.create(course=self.course, title='Second', order=2)
+        self.assertEqual(self.titles(), [('First', ['Welcome', 'Next']), ('Second', [])])
+
+        self.lesson.delete()
+        second.delete()
+        self.assertEqual(self.titles(), [('First', ['Next'])])
+
+    def test_other_courses_keep_their_outline(self):
+        other = Course.objects.create(title='Other', instructor=self.course.instructor, description='d')
+        get_course_outline(other.id)
+        self.titles()
+        Lesson.objects.create(module=self.module, title='Next', order=2)
+        self.assertIsNotNone(cache.get(outline_cache_key(other.id)))
+        self.assertIsNone(cache.get(outline_cache_key(self.course.id)))
+
+
+class ProgressCounterTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', instructor=instructor, description='d')
+        module = Module.objects.create(course=self.course, title='Only', order=1)
+        self.lessons = [Lesson.objects.create(module=module, title=f'L{n}', order=n) for n in (1, 2)]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+
+    def counters(self):
+        self.enrollment.refresh_from_db()
+        return self.enrollment.completed_lessons, self.enrollment.total_lessons
+
+    def test_completing_counts_each_lesson_once(self):
+        self.assertEqual(self.counters(), (0, 2))
+        self.assertTrue(complete_lesson(self.student, self.lessons[0]))
+        self.assertFalse(complete_lesson(self.student, self.lessons[0]))
+        self.assertEqual(self.counters(), (1, 2))
+        self.assertFalse(self.enrollment.is_complete)
+        self.assertFalse(Certificate.objects.exists())
+
+    def test_last_lesson_completes_the_course(self):
+        for lesson in self.lessons:
+            complete_lesson(self.student, lesson)
+        self.assertEqual(self.counters(), (2, 2))
+        self.assertTrue(self.enrollment.is_complete)
+        self.assertEqual(self.enrollment.progress_percent, 100)
+        self.assertTrue(Certificate.objects.filter(student=self.student, course=self.course).exists())
+
+    def test_recompute_progress_repairs_drift(self):
+        complete_lesson(self.student, self.lessons[0])
+        other = Course.objects.create(title='Other', instructor=self.course.instructor, description='d')
+        untouched = Enrollment.objects.create(student=self.student, course=other, completed_lessons=5)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_lessons=0, total_lessons=7)
+
+        out = StringIO()
+        call_command('recompute_progress', course=self.course.id, stdout=out)
+        self.assertIn('Fixed 1 enrollment(s).', out.getvalue())
+        self.assertEqual(self.counters(), (1, 2))
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.completed_lessons, 5)
+        self.assertEqual(recompute_enrollment_progress(Enrollment.objects.filter(course=self.course)), 0)
+
+
+class CoursePackageTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw', is_instructor=True)
+        self.importer = User.objects.create_user('importer', password='pw', is_instructor=True)
+        course = Course.objects.create(
+            title='Python', instructor=self.author, description='Basics', category='Code', price='19.00',
+        )
+        for m in (1, 2):
+            module = Module.objects.create(course=course, title=f'M{m}', order=m, available_after_days=m)
+            for n in (1, 2):
+                Lesson.objects.create(module=module, title=f'L{m}.{n}', order=n, notes=f'Notes, "{m}.{n}"')
+
+    def outline(self, instructor):
+        return [
+            (course.title, course.description, course.category, course.price, [
+                (module.title, module.order, module.available_after_days,
+                 [(lesson.title, lesson.order, lesson.notes) for lesson in module.lessons.order_by('order')])
+                for module in course.modules.order_by('order')
+            ])
+            for course in Course.objects.filter(instructor=instructor)
+        ]
+
+    def test_export_then_import_round_trips(self):
+        for fmt, (reader, writer, _) in FORMATS.items():
+            with self.subTest(fmt):
+                Course.objects.filter(instructor=self.importer).delete()
+                package = ''.join(writer(export_records(Course.objects.filter(instructor=self.author))))
+                result = import_package(reader(package.splitlines(keepends=True)), instructor=self.importer)
+                self.assertEqual((result.courses, result.modules, result.lessons), (1, 2, 4))
+                self.assertEqual(self.outline(self.importer), self.outline(self.author))
+
+    def test_imported_courses_start_unpublished(self):
+        Course.objects.update(is_published=True)
+        package = write_jsonl(export_records(Course.objects.all()))
+        import_package(read_jsonl(package), instructor=self.importer)
+        self.assertFalse(Course.objects.get(instructor=self.importer).is_published)
+
+    def test_a_bad_row_names_its_line_and_imports_nothing(self):
+        cases = [
+            ('{"type": "course", "title": "A", "description": "d", "price": "lots"}', 1, 'price'),
+            ('{"type": "course", "title": "A", "description": "d"}\n{"type": "lesson"}', 2, 'before any module'),
+            ('{"type": "course", "title": "A", "description": "d", "owner": "me"}', 1, 'unknown course field(s): owner'),
+            ('{"type": "course", "title": "A", "description": "d"}\n[1, 2]', 2, 'expected a JSON object'),
+        ]
+        for package, line, message in cases:
+            with self.subTest(message), self.assertRaises(PackageError) as raised:
+                import_package(read_jsonl(package.splitlines()), instructor=self.importer)
+            self.assertEqual(raised.exception.line, line)
+            self.assertIn(message, str(raised.exception))
+        self.assertFalse(Course.objects.filter(instructor=self.importer).exists())
+
+    def test_upload_reports_the_error(self):
+        self.client.force_login(self.importer)
+        upload = SimpleUploadedFile('courses.csv', b'type,title,description\ncourse,A,d\nmodule,,\n')
+        response = self.client.post(reverse('import_courses'), {'package': upload})
+        self.assertContains(response, 'Line 3: title: This field cannot be blank.')
+        self.assertFalse(Course.objects.filter(instructor=self.importer).exists())
+
+
+class ReorderCourseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.course = Course.objects.create(title='Course', instructor=self.instructor, description='d')
+        self.first = Module.objects.create(course=self.course, title='First', order=1)
+        self.second = Module.objects.create(course=self.course, title='Second', order=2)
+        self.a = Lesson.objects.create(module=self.first, title='A', order=1)
+        self.b = Lesson.objects.create(module=self.first, title='B', order=2)
+        self.c = Lesson.objects.create(module=self.second, title='C', order=1)
+        self.url = reverse('reorder_course', args=[self.course.id])
+        self.client.force_login(self.instructor)
+
+    def post(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def test_reorders_and_moves_lessons(self):
+        response = self.post({'modules': [
+            {'id': self.second.id, 'lessons': [self.b.id, self.c.id]},
+            {'id': self.first.id, 'lessons': [self.a.id]},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        outline = [(module['title'], [lesson['title'] for lesson in module['lessons']])
+                   for module in response.json()['modules']]
+        self.assertEqual(outline, [('Second', ['B', 'C']), ('First', ['A'])])
+        self.b.refresh_from_db()
+        self.assertEqual((self.b.module_id, self.b.order), (self.second.id, 1))
+
+    def test_invalid_orderings_change_nothing(self):
+        everything = [
+            {'id': self.first.id, 'lessons': [self.a.id, self.b.id]},
+            {'id': self.second.id, 'lessons': [self.c.id]},
+        ]
+        cases = [
+            ([], 'Expected'),
+            ({'modules': [{'id': 'x'}]}, 'integer id'),
+            ({'modules': [{'id': self.first.id, 'lessons': [self.a.id, self.b.id, self.c.id]}]}, 'every module'),
+            ({'modules': everything[:1] + [{'id': self.second.id}]}, 'every lesson'),
+            ({'modules': everything + [{'id': self.first.id}]}, 'more than once'),
+            ({'modules': [everything[0], {'id': self.second.id, 'lessons': [self.c.id, self.a.id]}]}, 'more than once'),
+            ({'modules': [everything[0], {'id': self.second.id, 'lessons': ['3']}]}, 'list of ids'),
+            ({'modules': [everything[0], {'id': self.second.id, 'lessons': [True]}]}, 'list of ids'),
+            ({'modules': [everything[0], {'id': True, 'lessons': [self.c.id]}]}, 'integer id'),
+        ]
+        for payload, message in cases:
+            with self.subTest(payload):
+                response = self.post(payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()['error'])
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.assertEqual(
+            list(Lesson.objects.order_by('id').values_list('module_id', 'order')),
+            [(self.first.id, 1), (self.first.id, 2), (self.second.id, 1)],
+        )
+
+    def test_only_the_owner_can_reorder(self):
+        self.client.force_login(User.objects.create_user('other', password='pw', is_instructor=True))
+        self.assertEqual(self.post({'modules': []}).status_code, 404)
+
+
+class InstructorReportTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        rival = User.objects.create_user('rival', password='pw', is_instructor=True)
+        self.course = Course.objects.create(title='Mine', instructor=self.instructor, description='d')
+        self.other = Course.objects.create(title='Theirs', instructor=rival, description='d')
+        module = Module.objects.create(course=self.course, title='M', order=1)
+        lesson = Lesson.objects.create(module=module, title='L', order=1)
+        for day in (1, 5, 10):
+            student = User.objects.create_user(f'student{day}', password='pw')
+            on_day = timezone.make_aware(datetime(2025, 1, day, 12))
+            for course in (self.course, self.other):
+                enrollment = Enrollment.objects.create(student=student, course=course)
+                Enrollment.objects.filter(pk=enrollment.pk).update(enrolled_on=on_day)
+            progress = StudentProgress.objects.create(student=student, lesson=lesson, completed=True)
+            StudentProgress.objects.filter(pk=progress.pk).update(completed_at=on_day)
+        self.client.force_login(self.instructor)
+
+    def download(self, report, **params):
+        response = self.client.get(reverse('export_report', args=[report]), params)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_enrollments_only_cover_the_instructors_courses(self):
+        header, *rows = self.download('enrollments')
+        self.assertEqual(header[:3], ['course_id', 'course', 'student'])
+        self.assertEqual([row[2] for row in rows], ['student1', 'student5', 'student10'])
+        self.assertEqual({row[1] for row in rows}, {'Mine'})
+        self.assertEqual(rows[0][-3:], ['0', '1', '0'])
+
+    def test_date_filters_include_both_days(self):
+        _, *rows = self.download('enrollments', start='2025-01-05', end='2025-01-10')
+        self.assertEqual([row[2] for row in rows], ['student5', 'student10'])
+        _, *rows = self.download('progress', end='2025-01-05')
+        self.assertEqual([row[5] for row in rows], ['student1', 'student5'])
+
+    def test_bad_filters_are_rejected(self):
+        url = reverse('export_report', args=['enrollments'])
+        self.assertEqual(self.client.get(url, {'start': '2025-01-10', 'end': '2025-01-05'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'course': self.other.id}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_report', args=['payouts'])).status_code, 404)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        course = Course.objects.create(title='Course', instructor=admin, description='d')
+        for number in range(3):
+            student = User.objects.create_user(f'student{number}', password='pw')
+            Enrollment.objects.create(student=student, course=course)
+        self.url = reverse('admin:app_enrollment_changelist')
+        self.client.force_login(admin)
+
+    def get(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in queries]
+
+    def test_filtered_changelist_skips_the_full_table_count(self):
+        response, queries = self.get({'q': 'student1'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        counts = [sql for sql in queries if 'COUNT(' in sql and 'app_enrollment' in sql]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIKE', counts[0])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        _, few = self.get()
+        Enrollment.objects.create(student=User.objects.create_user('late', password='pw'), course=Course.objects.get())
+        _, more = self.get()
+        self.assertEqual(len(few), len(more))
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        for number in range(3):
+            Course.objects.create(title=f'Course {number}', instructor=instructor, description='d')
+
+    @mock.patch.object(EstimatedCountPaginator, 'exact_limit', 2)
+    def test_postgres_estimates_only_past_the_exact_limit(self):
+        courses = Course.objects.order_by('-id')
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch('app.pagination.approximate_count', return_value=5000) as estimate:
+            self.assertEqual(EstimatedCountPaginator(courses.filter(title='Course 1'), 10).count, 1)
+            estimate.assert_not_called()
+            self.assertEqual(EstimatedCountPaginator(courses, 10).count, 5000)
+        self.assertEqual(EstimatedCountPaginator(courses, 10).count, 3)
+
+
+class HomeCategoryFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        for title, category in (('Essays', 'Écriture'), ('Python', 'Code')):
+            Course.objects.create(title=title, instructor=instructor, description='d', category=category)
+
+    def titles(self, category):
+        response = self.client.get(reverse('home'), {'category': category})
+        return [course.title for course in response.context['courses']]
+
+    def test_category_match_ignores_ascii_case(self):
+        self.assertEqual(self.titles('code'), ['Python'])
+        self.assertEqual(self.titles('CODE'), ['Python'])
+
+    def test_non_ascii_categories_match_as_listed(self):
+        self.assertEqual(self.titles('Écriture'), ['Essays'])
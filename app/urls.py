@@ -20,10 +20,15 @@ urlpatterns = [
     path('instructor/module/<int:module_id>/add_lesson/', views.add_lesson, name='add_lesson'),
     path('instructor/lesson/<int:lesson_id>/edit/', views.edit_lesson, name='edit_lesson'),
     path('instructor/course/<int:course_id>/edit/', views.instructor_edit_course, name='instructor_edit_course'),
+    path('instructor/course/<int:course_id>/reorder/', views.reorder_course, name='reorder_course'),
+    path('instructor/import/', views.import_courses, name='import_courses'),
+    path('instructor/export/', views.export_courses, name='export_courses'),
+    path('instructor/reports/', views.instructor_reports, name='instructor_reports'),
+    path('instructor/reports/<slug:report>.csv', views.export_report, name='export_report'),
 
     # Student
     path('dashboard/', views.student_dashboard, name='student_dashboard'),
-    path('course/<int:course_id>/', views.view_course, name='view_course'),
+    path('course/<int:course_id>/modules/', views.view_course, name='view_course'),
     path('course/<int:course_id>/classroom/', views.classroom_view, name='classroom_view'),
     path('course/<int:course_id>/classroom/<int:lesson_id>/',views.classroom_view, name='classroom_view'),
 
@@ -34,4 +39,5 @@ urlpatterns = [
     path('lesson/<int:course_id>/<int:lesson_id>', views.mark_lesson_complete, name='mark_lesson_complete'),
 
     path('zoom/<int:course_id>/', views.zoom_classroom, name='zoom_classroom'),
+    path('course/<int:course_id>/certificate/', views.generate_certificate, name='generate_certificate'),
 ]
@@ -1,11 +1,30 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import io
+import json
+from dataclasses import asdict
+
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.http import HttpResponse
-from .models import Course, Module, Lesson, Enrollment, StudentProgress
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.db.models import Prefetch, Value
+from django.db.models.functions import Lower
+from django.views.decorators.http import condition, require_POST
+from .models import Certificate, Course, Module, Lesson, Enrollment, StudentProgress
+from .caching import cache_anonymous_page
+from .certificates import has_pdf, issue_certificate, schedule_render, stored_pdf
+from .classroom import abuild_classroom
+from .course_io import FORMATS, PackageError, export_records, import_package, package_format
+from .drip import get_drip_state
+from .ordering import apply_ordering
+from .outline import aget_course_outline, get_course_outline
+from .progress import complete_lesson
+from .reports import REPORTS, write_report
+from .shortcuts import arender, download_response
+from payment.ledger import available_balance
+from Lms.routers import replica_reads
 from django.template.loader import render_to_string
 
-from .forms import CustomUserCreationForm
+from .forms import CustomUserCreationForm, ReportFilterForm
 from django.contrib.auth import login
 
 
@@ -32,25 +51,33 @@ def register(request):
     return render(request, "auth/register.html", {"form": form})
 
 
-def home(request):
+@cache_anonymous_page()
+@replica_reads
+async def home(request):
     category = request.GET.get("category")
     course_type = request.GET.get("course_type")
 
-    courses = Course.objects.all()
+    courses = Course.objects.for_card()
 
+    # Match on lower(category) so the functional index is used on every backend.
+    # The database lowers both sides: SQLite's LOWER() only folds ASCII, so
+    # comparing against str.lower() would miss categories like "Écriture".
     if category and category != "all":
-        courses = courses.filter(category__iexact=category)
+        courses = courses.alias(category_lower=Lower('category')).filter(category_lower=Lower(Value(category)))
 
+    # Choice values are stored upper-case, so an exact match can use the index
     if course_type and course_type != "all":
-        courses = courses.filter(course_type__iexact=course_type)
+        courses = courses.filter(course_type=course_type.upper())
 
     # Show only 6 courses
-    courses = courses[:6]
+    courses = [course async for course in courses[:6]]
 
-    categories = Course.objects.values_list("category", flat=True).distinct()
+    categories = [
+        name async for name in Course.objects.order_by("category").values_list("category", flat=True).distinct()
+    ]
     course_types = Course.COURSE_TYPE_CHOICES
 
-    return render(request, "home.html", {
+    return await arender(request, "home.html", {
         "courses": courses,
         "categories": categories,
         "course_types": course_types,
@@ -59,13 +86,14 @@ def home(request):
     })
 
 
-def course_detail(request, course_id):
-    course = get_object_or_404(Course, id=course_id)
-    total_modules = course.modules.count()
-    total_lessons = sum(module.lessons.count() for module in course.modules.all())
+@replica_reads
+async def course_detail(request, course_id):
+    course = await aget_object_or_404(Course.objects.select_related('instructor'), id=course_id)
+    outline = await aget_course_outline(course.id)
 
-    return render(request, 'course_detail.html', {'course': course,    'total_modules': total_modules,
-    'total_lessons': total_lessons,
+    return await arender(request, 'course_detail.html', {'course': course,    'total_modules': outline.module_count,
+    'total_lessons': outline.lesson_count,
+    'outline': outline,
 })
 
 def lesson_detail(request, lesson_id):
@@ -79,8 +107,66 @@ def lesson_detail(request, lesson_id):
 def instructor_dashboard(request):
     if not request.user.is_instructor:
         return redirect('student_dashboard')
-    courses = Course.objects.filter(instructor=request.user)
-    return render(request, 'instructor/dashboard.html', {'courses': courses})
+    courses = Course.objects.for_card().filter(instructor=request.user)
+    return render(request, 'instructor/dashboard.html', {
+        'courses': courses,
+        'balance': available_balance(request.user),
+    })
+
+
+# Bulk import / export of course packages (see app.course_io)
+@login_required
+def import_courses(request):
+    if not request.user.is_instructor:
+        return redirect('student_dashboard')
+    error = result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('package')
+        reader = FORMATS.get(package_format(upload.name) if upload else None)
+        if reader is None:
+            error = "Upload a .jsonl or .csv course package."
+        else:
+            try:
+                result = import_package(reader[0](upload), instructor=request.user)
+            except PackageError as exc:
+                error = str(exc)
+    return render(request, 'instructor/import_courses.html', {'error': error, 'result': result})
+
+
+@login_required
+def export_courses(request):
+    if not request.user.is_instructor:
+        return redirect('student_dashboard')
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in FORMATS:
+        raise Http404("Unknown export format.")
+    _, writer, content_type = FORMATS[fmt]
+    records = export_records(Course.objects.filter(instructor=request.user))
+    return download_response(writer(records), content_type, f'courses.{fmt}')
+
+
+# Enrollment and completion reports (see app.reports)
+@login_required
+def instructor_reports(request):
+    if not request.user.is_instructor:
+        return redirect('student_dashboard')
+    form = ReportFilterForm(request.user, request.GET or None)
+    return render(request, 'instructor/reports.html', {'form': form})
+
+
+@login_required
+def export_report(request, report):
+    if not request.user.is_instructor:
+        return redirect('student_dashboard')
+    if report not in REPORTS:
+        raise Http404("Unknown report.")
+    form = ReportFilterForm(request.user, request.GET)
+    if not form.is_valid():
+        return render(request, 'instructor/reports.html', {'form': form}, status=400)
+    header, rows = REPORTS[report]
+    rows = rows(request.user, form.cleaned_data['start'], form.cleaned_data['end'], form.cleaned_data['course'])
+    return download_response(write_report(header, rows), 'text/csv', f'{report}.csv')
+
 
 # Create Course
 @login_required
@@ -214,15 +300,22 @@ def edit_lesson(request, lesson_id):
 
 
 @login_required
-def instructor_edit_course(request, course_id):
+@require_POST
+def reorder_course(request, course_id):
     course = get_object_or_404(Course, id=course_id, instructor=request.user)
-    modules = course.modules.order_by('order').all()
+    try:
+        outline = apply_ordering(course, json.loads(request.body))
+    except ValueError as exc:
+        # Malformed JSON and OrderingError alike
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(asdict(outline))
+
 
-    # For each module, fetch lessons ordered
-    modules_with_lessons = []
-    for module in modules:
-        lessons = module.lessons.order_by('order').all()
-        modules_with_lessons.append((module, lessons))
+@login_required
+def instructor_edit_course(request, course_id):
+    course = get_object_or_404(Course, id=course_id, instructor=request.user)
+    outline = get_course_outline(course.id)
+    modules_with_lessons = [(module, module.lessons) for module in outline.modules]
 
     return render(request, 'instructor/edit_course.html', {
         'course': course,
@@ -239,24 +332,67 @@ def student_dashboard(request):
     user=request.user
     if user.is_instructor == True:
         return redirect('instructor_dashboard')
-    enrollments = Enrollment.objects.filter(student=request.user)
+    enrollments = Enrollment.objects.filter(student=request.user).prefetch_related(
+        Prefetch('course', queryset=Course.objects.for_card())
+    )
     return render(request, 'student/dashboard.html', {'enrollments': enrollments})
 
 
 # View Course Modules (Drip Content)
 @login_required
 def view_course(request, course_id):
-    enrollment = get_object_or_404(Enrollment, course_id=course_id, student=request.user)
-    available_modules = enrollment.course.module_set.filter(
-        available_after_days__lte=(timezone.now() - enrollment.enrolled_on).days
-    )
-    return render(request, 'student/view_course.html', {'enrollment': enrollment, 'modules': available_modules})
+    enrollment = get_object_or_404(Enrollment.objects.select_related('course'), course_id=course_id, student=request.user)
+    drip = get_drip_state(enrollment.id)
+    modules = [
+        (module, [lesson for lesson in module.lessons if lesson.id in drip.lesson_ids])
+        for module in get_course_outline(course_id).modules
+        if module.id in drip.module_ids
+    ]
+    return render(request, 'student/view_course.html', {
+        'enrollment': enrollment,
+        'modules': modules,
+        'next_unlock_at': drip.next_unlock_at,
+    })
+
 
 
 
 
 
 
+def _certificate_etag(request, course_id):
+    # The content hash names the PDF, so it doubles as a strong ETag
+    if not request.user.is_authenticated:
+        return None
+    certificate = Certificate.objects.filter(student=request.user, course_id=course_id).only('content_hash').first()
+    return certificate.content_hash if certificate and has_pdf(certificate) else None
+
+
+@login_required
+@condition(etag_func=_certificate_etag)
+def generate_certificate(request, course_id):
+    enrollment = get_object_or_404(
+        Enrollment.objects.select_related('course'), course_id=course_id, student=request.user,
+    )
+    if not (enrollment.total_lessons and enrollment.is_complete):
+        raise Http404("Finish every lesson to get the certificate.")
+
+    certificate = issue_certificate(request.user, course_id)
+    pdf = stored_pdf(certificate)
+    if pdf is None:
+        # Still rendering (or the cache was cleared); never render inline
+        schedule_render(certificate)
+        response = render(request, 'student/certificate_pending.html', {'course': enrollment.course}, status=202)
+        response['Retry-After'] = '5'
+        return response
+
+    response = FileResponse(
+        io.BytesIO(pdf), as_attachment=True, content_type='application/pdf',
+        filename=f'certificate-{course_id}.pdf',
+    )
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 
 # Zoom Meeting Info (dummy view)
 @login_required
@@ -270,67 +406,24 @@ from django.utils import timezone
 
 
 @login_required
-def classroom_view(request, course_id, lesson_id=None):
-    course = get_object_or_404(Course, id=course_id)
-    modules = Module.objects.filter(course=course).prefetch_related('lessons').all()
-    enrollment = Enrollment.objects.filter(student=request.user,course=course_id)
-    if not enrollment:
+async def classroom_view(request, course_id, lesson_id=None):
+    course = await aget_object_or_404(Course.objects.select_related('instructor'), id=course_id)
+    context = await abuild_classroom(await request.auser(), course, lesson_id)
+    if context is None:
         return redirect('home')
 
-    all_lessons = Lesson.objects.filter(module__course=course).order_by('module__id', 'order')  # Add 'order' if available
-
-    selected_lesson = all_lessons.first()
-
-    if lesson_id:
-        selected_lesson = get_object_or_404(Lesson, id=lesson_id, module__course=course)
-
-
-
-
-    # ✅ FIXED: Correct filtering by course via related fields
-    completed_lessons = StudentProgress.objects.filter(
-        student=request.user,
-        lesson__module__course=course,
-                completed=True
-
-    ).values_list('lesson_id', flat=True)
-
- 
-
-    is_completed = False
-    if selected_lesson:
-        is_completed = selected_lesson.id in completed_lessons
-
-
-    # Count total vs completed lessons
-    all_lessons = Lesson.objects.filter(module__course=course)
-    all_completed = all_lessons.count() == len(completed_lessons)
-
-    # 🔥 Related courses in the same category (excluding current course)
-    related_courses = Course.objects.filter(category=course.category).exclude(id=course.id)[:4]
-
-
-    return render(request, 'classroom.html', {
-        'course': course,
-        'modules': modules,
-        'selected_lesson': selected_lesson,
-        'completed_lessons': list(completed_lessons),
-        "is_completed":is_completed,
-        'all_completed': all_completed,
-        'related_courses': related_courses,  # 👈 pass to template
-
-
-    })
+    return await arender(request, 'classroom.html', context)
 
 
 @login_required
 def mark_lesson_complete(request, course_id, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
-    progress, created = StudentProgress.objects.get_or_create(student=request.user, lesson=lesson)
-
-    if not progress.completed:
-        progress.completed = True
-        progress.save()
+    lesson = get_object_or_404(Lesson.objects.select_related('module'), id=lesson_id)
+    enrollment_id = Enrollment.objects.filter(
+        student=request.user, course_id=lesson.module.course_id,
+    ).values_list('id', flat=True).first()
+    # Only enrolled students, and only lessons their drip schedule has opened
+    if enrollment_id is not None and lesson.id in get_drip_state(enrollment_id).lesson_ids:
+        complete_lesson(request.user, lesson)
 
     return redirect('classroom_view', course_id=course_id)
 
@@ -1,3 +1,51 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CheckoutFulfillment, LedgerEntry, PayoutRequest, StripeEvent
+from .payouts import approve_payouts, reject_payouts
+
+
+@admin.register(PayoutRequest)
+class PayoutRequestAdmin(admin.ModelAdmin):
+    list_display = ('instructor', 'amount', 'requested_at', 'status', 'attempts', 'transfer_id')
+    list_filter = ('status',)
+    search_fields = ('instructor__username', 'transfer_id', 'batch_key')
+    ordering = ('-requested_at',)
+    actions = ('approve', 'reject')
+
+    @admin.action(description="Approve selected payouts needing review")
+    def approve(self, request, queryset):
+        self.message_user(request, f"{approve_payouts(queryset)} payout(s) queued for transfer.")
+
+    @admin.action(description="Reject and refund selected payouts needing review")
+    def reject(self, request, queryset):
+        self.message_user(request, f"{reject_payouts(queryset)} payout(s) rejected and refunded.")
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'received_at')
+    list_filter = ('type',)
+    search_fields = ('event_id',)
+    ordering = ('-received_at',)
+
+
+@admin.register(CheckoutFulfillment)
+class CheckoutFulfillmentAdmin(admin.ModelAdmin):
+    list_display = ('session_id', 'student', 'course', 'amount', 'fulfilled_at')
+    search_fields = ('session_id', 'student__username', 'course__title')
+    ordering = ('-fulfilled_at',)
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    # Append-only: corrections are posted as new adjustment entries
+    list_display = ('instructor', 'kind', 'amount', 'reference', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('instructor__username', 'reference')
+    ordering = ('-id',)
+
+    def has_change_permission(self, request, obj=None):
+        return obj is None
+
+    def has_delete_permission(self, request, obj=None):
+        return False
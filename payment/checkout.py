@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .gateway import get_gateway
+
+CHECKOUT_SESSION_TTL = timedelta(hours=1)
+# Stop handing out a cached session this close to its expiry
+EXPIRY_MARGIN = timedelta(minutes=5)
+
+
+def checkout_cache_key(user, course):
+    # The price is part of the key so a price change never reuses a stale session
+    return f'checkout_session:{user.pk}:{course.pk}:{course.price}'
+
+
+def get_checkout_url(user, course, success_url, cancel_url):
+    """Return the URL of an open Checkout Session for this user and course.
+
+    Repeat clicks reuse the cached session until shortly before it expires
+    rather than calling Stripe again.
+    """
+    key = checkout_cache_key(user, course)
+    url = cache.get(key)
+    if url:
+        return url
+
+    session = get_gateway().create_checkout_session(
+        user, course, success_url, cancel_url, expires_at=timezone.now() + CHECKOUT_SESSION_TTL,
+    )
+    cache.set(key, session['url'], (CHECKOUT_SESSION_TTL - EXPIRY_MARGIN).total_seconds())
+    return session['url']
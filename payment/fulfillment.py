@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from app.models import Course, Enrollment
+from tasks.queue import task
+
+from .gateway import GatewayError, get_gateway
+from .models import CheckoutFulfillment, LedgerEntry, StripeEvent
+
+FULFILLMENT_EVENTS = {'checkout.session.completed', 'checkout.session.async_payment_succeeded'}
+
+
+def fulfill_checkout(session):
+    """Enroll the buyer and credit the instructor for a paid Checkout Session.
+
+    Safe to call repeatedly and from concurrent workers: the fulfillment row
+    is unique per session, so only the first caller applies side effects.
+    Returns ``(fulfillment, created)``.
+    """
+    metadata = session.get('metadata') or {}
+    course = Course.objects.only('id', 'instructor_id').get(id=metadata['course_id'])
+    amount = Decimal(session['amount_total']) / 100
+
+    with transaction.atomic():
+        fulfillment, created = CheckoutFulfillment.objects.get_or_create(
+            session_id=session['id'],
+            defaults={'student_id': metadata['student_id'], 'course': course, 'amount': amount},
+        )
+        if created:
+            Enrollment.objects.get_or_create(student_id=fulfillment.student_id, course=course)
+            # An insert, not an update of the instructor's row, so concurrent
+            # sales never contend; the rollup folds it into the balance.
+            LedgerEntry.objects.create(
+                instructor_id=course.instructor_id, kind=LedgerEntry.SALE, amount=amount,
+                reference=session['id'], memo=f'Course {course.id}',
+            )
+    return fulfillment, created
+
+
+@task
+def fulfill_session(session):
+    """fulfill_checkout on the worker. ``session`` is a plain dict, as
+    returned by session_fields."""
+    fulfill_checkout(session)
+
+
+@task(max_attempts=3)
+def confirm_checkout(session_id, course_id, student_id):
+    """Fulfill a session the buyer came back from, once Stripe confirms it's
+    theirs and paid. Covers a success page that beats the webhook."""
+    try:
+        session = get_gateway().retrieve_checkout_session(session_id)
+    except GatewayError as exc:
+        if exc.retryable:
+            raise
+        return
+    metadata = session.get('metadata') or {}
+    if (
+        session.get('payment_status') == 'paid'
+        and metadata.get('course_id') == str(course_id)
+        and metadata.get('student_id') == str(student_id)
+    ):
+        fulfill_checkout(session)
+
+
+def session_fields(session):
+    # What fulfill_checkout reads, as JSON the task queue can store
+    return {
+        'id': session['id'],
+        'amount_total': session['amount_total'],
+        'metadata': dict(session.get('metadata') or {}),
+    }
+
+
+def handle_event(event):
+    """Record a verified Stripe event once and queue its side effects.
+    Returns False for a redelivery."""
+    with transaction.atomic():
+        _, created = StripeEvent.objects.get_or_create(
+            event_id=event['id'], defaults={'type': event['type']},
+        )
+        if not created:
+            return False
+        # Queued in the same transaction as the event row, so neither can be
+        # lost without the other; the worker retries a failed fulfillment.
+        if event['type'] in FULFILLMENT_EVENTS:
+            session = event['data']['object']
+            if session.get('payment_status') == 'paid':
+                fulfill_session.enqueue(session_fields(session), key=f"fulfill:{session['id']}")
+    return True
@@ -0,0 +1,137 @@
+from functools import lru_cache
+
+import stripe
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class GatewayError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class PaymentGateway:
+    """Everything we ask of the payment provider. Swap it with PAYMENT_GATEWAY."""
+
+    def create_checkout_session(self, user, course, success_url, cancel_url, expires_at):
+        """Open a hosted checkout for ``course``. Returns a dict with id and url."""
+        raise NotImplementedError
+
+    def retrieve_checkout_session(self, session_id):
+        """Return the session as a dict-like object, or raise GatewayError."""
+        raise NotImplementedError
+
+    def transfer(self, amount, destination, idempotency_key, metadata=None):
+        """Send ``amount`` (a Decimal in dollars) to a connected account.
+
+        Returns the provider's transfer id. Repeating a call with the same
+        ``idempotency_key`` must not move money twice.
+        """
+        raise NotImplementedError
+
+
+class StripeGateway(PaymentGateway):
+    """Stripe Checkout for sales, Stripe Connect transfers for payouts.
+
+    One StripeClient per process (see get_gateway), so requests reuse pooled
+    HTTP connections, with explicit timeouts instead of the library's 80s.
+    """
+
+    # Worth another try with the same idempotency key
+    RETRYABLE = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+    def __init__(self):
+        self.client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=stripe.RequestsClient(timeout=settings.STRIPE_TIMEOUT),
+            max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+        )
+
+    def create_checkout_session(self, user, course, success_url, cancel_url, expires_at):
+        session = self._call(self.client.checkout.sessions.create, params={
+            'payment_method_types': ['card'],
+            'line_items': [{
+                'price_data': {
+                    'currency': 'usd',
+                    'unit_amount': int(course.price * 100),
+                    'product_data': {
+                        'name': course.title,
+                    },
+                },
+                'quantity': 1,
+            }],
+            'mode': 'payment',
+            # Fulfillment reads these back from the webhook, never from the browser
+            'client_reference_id': str(user.id),
+            'metadata': {'course_id': str(course.id), 'student_id': str(user.id)},
+            'success_url': success_url,
+            'cancel_url': cancel_url,
+            'customer_email': user.email or None,
+            'expires_at': int(expires_at.timestamp()),
+        })
+        return {'id': session.id, 'url': session.url}
+
+    def retrieve_checkout_session(self, session_id):
+        return self._call(self.client.checkout.sessions.retrieve, session_id)
+
+    def transfer(self, amount, destination, idempotency_key, metadata=None):
+        transfer = self._call(
+            self.client.transfers.create,
+            params={
+                'amount': int(amount * 100),
+                'currency': 'usd',
+                'destination': destination,
+                'metadata': metadata or {},
+            },
+            options={'idempotency_key': idempotency_key},
+        )
+        return transfer.id
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except self.RETRYABLE as exc:
+            raise GatewayError(str(exc), retryable=True) from exc
+        except stripe.StripeError as exc:
+            raise GatewayError(str(exc)) from exc
+
+
+class FakeGateway(PaymentGateway):
+    """In-process stand-in for local runs: records sessions and transfers, charges nothing."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.transfers = {}
+
+    def create_checkout_session(self, user, course, success_url, cancel_url, expires_at):
+        # Paid on creation, so the success page fulfills it straight away
+        session_id = f'cs_fake_{len(self.sessions) + 1}'
+        self.sessions[session_id] = {
+            'id': session_id,
+            'payment_status': 'paid',
+            'amount_total': int(course.price * 100),
+            'metadata': {'course_id': str(course.id), 'student_id': str(user.id)},
+        }
+        return {'id': session_id, 'url': success_url.replace('{CHECKOUT_SESSION_ID}', session_id)}
+
+    def retrieve_checkout_session(self, session_id):
+        try:
+            return self.sessions[session_id]
+        except KeyError:
+            raise GatewayError(f"No such checkout session: {session_id}") from None
+
+    def transfer(self, amount, destination, idempotency_key, metadata=None):
+        if idempotency_key not in self.transfers:
+            self.transfers[idempotency_key] = {
+                'id': f'tr_fake_{len(self.transfers) + 1}',
+                'amount': amount,
+                'destination': destination,
+                'metadata': metadata or {},
+            }
+        return self.transfers[idempotency_key]['id']
+
+
+@lru_cache(maxsize=None)
+def get_gateway():
+    return import_string(settings.PAYMENT_GATEWAY)()
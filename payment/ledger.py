@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from app.models import User
+
+from .models import LedgerEntry, LedgerRollup
+
+# Entries younger than this are left for the next rollup, so a writer whose
+# transaction committed a lower id late isn't skipped by the watermark.
+ROLLUP_GRACE = timedelta(seconds=30)
+
+CENT = Decimal('0.01')
+ZERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def post_entries(entries):
+    """Append entries in one INSERT. Never touches the instructors' rows."""
+    return LedgerEntry.objects.bulk_create(entries)
+
+
+def _ledger_total(**filters):
+    # Per-instructor sum of entries, for use as a subquery against User
+    return Coalesce(Subquery(
+        LedgerEntry.objects.filter(instructor=OuterRef('pk'), **filters)
+        .order_by().values('instructor').annotate(total=Sum('amount')).values('total')
+    ), ZERO)
+
+
+def _watermark():
+    return Coalesce(Subquery(LedgerRollup.objects.filter(pk=1).values('last_entry_id')), Value(0))
+
+
+def available_balance(instructor):
+    """Materialized balance plus whatever was posted since the last rollup.
+
+    One statement, so it can't see a rollup half-applied.
+    """
+    available = (
+        User.objects.filter(pk=instructor.pk)
+        .annotate(available=F('balance') + _ledger_total(id__gt=_watermark()))
+        .values_list('available', flat=True)
+        .get()
+    )
+    # SQLite's arithmetic drops the scale, so normalize to cents
+    return Decimal(available).quantize(CENT)
+
+
+def rollup_balances(grace=ROLLUP_GRACE):
+    """Fold settled entries into User.balance. Returns how many were folded."""
+    cutoff = timezone.now() - grace
+    with transaction.atomic():
+        rollup, _ = LedgerRollup.objects.select_for_update().get_or_create(pk=1)
+        pending = LedgerEntry.objects.filter(id__gt=rollup.last_entry_id)
+        upto = pending.filter(created_at__lte=cutoff).aggregate(upto=Max('id'))['upto']
+        if upto is None:
+            return 0
+
+        folded = 0
+        totals = (
+            pending.filter(id__lte=upto).order_by()
+            .values('instructor').annotate(total=Sum('amount'), entries=Count('id'))
+        )
+        for row in totals:
+            User.objects.filter(pk=row['instructor']).update(balance=F('balance') + row['total'])
+            folded += row['entries']
+
+        rollup.last_entry_id = upto
+        rollup.rolled_up_at = timezone.now()
+        rollup.save()
+    return folded
+
+
+def reconcile(fix=False):
+    """Compare every materialized balance with the ledger up to the watermark.
+
+    Returns ``[(user_id, balance, expected), ...]`` for the users that drifted,
+    and resets them to the ledger's figure when ``fix`` is set.
+    """
+    with transaction.atomic():
+        rollup, _ = LedgerRollup.objects.select_for_update().get_or_create(pk=1)
+        drifted = list(
+            User.objects.annotate(expected=_ledger_total(id__lte=rollup.last_entry_id))
+            .exclude(balance=F('expected'))
+            .values_list('id', 'balance', 'expected')
+        )
+        if fix:
+            for user_id, _, expected in drifted:
+                User.objects.filter(pk=user_id).update(balance=expected)
+    return drifted
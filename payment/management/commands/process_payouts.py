@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from payment.payouts import MAX_ATTEMPTS, process_payouts
+
+
+class Command(BaseCommand):
+    help = "Send pending payout requests to Stripe Connect, one transfer per instructor."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Instructors to load per query.")
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                            help="Runs a group may fail on retryable errors before it's marked failed.")
+        parser.add_argument('--report-every', type=int, default=100, help="Print progress every N groups.")
+
+    def handle(self, *args, **options):
+        every = options['report_every']
+
+        def progress(stats):
+            done = sum(stats.values())
+            if every and done % every == 0:
+                self.stdout.write(f"{done} group(s): {self.summary(stats)}")
+
+        stats = process_payouts(
+            batch_size=options['batch_size'], max_attempts=options['max_attempts'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done. {self.summary(stats) or 'Nothing to pay.'}"))
+
+    def summary(self, stats):
+        return ', '.join(f"{count} {outcome}" for outcome, count in sorted(stats.items()))
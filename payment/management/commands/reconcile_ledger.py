@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.ledger import reconcile
+
+
+class Command(BaseCommand):
+    help = "Check materialized instructor balances against the ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Reset drifted balances to the ledger's total.")
+
+    def handle(self, *args, **options):
+        drifted = reconcile(fix=options['fix'])
+        for user_id, balance, expected in drifted:
+            self.stdout.write(f"user {user_id}: balance {balance}, ledger {expected}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All balances match the ledger."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifted)} balance(s)."))
+        else:
+            raise CommandError(f"{len(drifted)} balance(s) drifted from the ledger; rerun with --fix.")
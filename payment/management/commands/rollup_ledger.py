@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from payment.ledger import ROLLUP_GRACE, rollup_balances
+
+
+class Command(BaseCommand):
+    help = "Fold new ledger entries into instructor balances. Run this periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=int(ROLLUP_GRACE.total_seconds()),
+            help="Leave entries younger than this many seconds for the next run.",
+        )
+
+    def handle(self, *args, **options):
+        folded = rollup_balances(grace=timedelta(seconds=options['grace']))
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {folded} ledger entr{'y' if folded == 1 else 'ies'}."))
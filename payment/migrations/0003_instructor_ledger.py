@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def open_ledger(apps, schema_editor):
+    # Existing balances become opening adjustments, already rolled up, so
+    # User.balance and the ledger agree from the first entry.
+    User = apps.get_model('app', 'User')
+    LedgerEntry = apps.get_model('payment', 'LedgerEntry')
+    LedgerRollup = apps.get_model('payment', 'LedgerRollup')
+
+    LedgerEntry.objects.bulk_create(
+        LedgerEntry(
+            instructor_id=user_id, kind='adjustment', amount=balance,
+            reference=f'opening:{user_id}', memo='Opening balance',
+        )
+        for user_id, balance in User.objects.exclude(balance=0).values_list('id', 'balance').iterator()
+    )
+    last_entry_id = LedgerEntry.objects.aggregate(last=Max('id'))['last'] or 0
+    LedgerRollup.objects.create(pk=1, last_entry_id=last_entry_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_checkout_idempotency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_entry_id', models.BigIntegerField(default=0)),
+                ('rolled_up_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('refund', 'Refund'), ('payout', 'Payout'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(blank=True, max_length=255)),
+                ('memo', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['instructor', '-id'], name='ledger_instructor_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reference', ''), _negated=True), fields=('kind', 'reference'), name='unique_ledger_reference')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
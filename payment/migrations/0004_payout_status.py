@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_legacy_status(apps, schema_editor):
+    PayoutRequest = apps.get_model('payment', 'PayoutRequest')
+    PayoutRequest.objects.filter(processed=True).update(status='paid')
+    # Unprocessed requests may have been paid by hand; don't transfer them again
+    PayoutRequest.objects.filter(processed=False).update(status='review')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_instructor_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payoutrequest',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='payoutrequest',
+            name='batch_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='payoutrequest',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='payoutrequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('paid', 'Paid'), ('failed', 'Failed'), ('review', 'Needs review')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='payoutrequest',
+            name='transfer_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='payoutrequest',
+            index=models.Index(fields=['status', 'instructor'], name='payout_status_idx'),
+        ),
+        migrations.RunPython(set_legacy_status, migrations.RunPython.noop),
+    ]
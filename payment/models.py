@@ -1,11 +1,117 @@
 from django.db import models
+from django.db.models import Q
 from app.models import *
 
 
 # Create your models here.
 class PayoutRequest(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    PAID = 'paid'
+    FAILED = 'failed'
+    # Requests from before payment.payouts; an admin approves or rejects them
+    REVIEW = 'review'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (PAID, 'Paid'),
+        (FAILED, 'Failed'),
+        (REVIEW, 'Needs review'),
+    ]
+
     instructor = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     requested_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
     processed_at = models.DateTimeField(null=True, blank=True)
+
+    # Set by payment.payouts; requests paid together share a batch_key, which
+    # is also the transfer's idempotency key.
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    batch_key = models.CharField(max_length=64, blank=True, db_index=True)
+    transfer_id = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'instructor'], name='payout_status_idx'),
+        ]
+
+
+class StripeEvent(models.Model):
+    # One row per webhook event we've handled; Stripe retries and redelivers,
+    # so the unique event id is what makes handling idempotent.
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.type} {self.event_id}"
+
+
+class CheckoutFulfillment(models.Model):
+    # Both the webhook and the success page can fulfill a session; whichever
+    # inserts this row first applies the enrollment and the balance credit.
+    session_id = models.CharField(max_length=255, unique=True)
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkout_fulfillments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    fulfilled_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.session_id} ({self.student} -> {self.course_id})"
+
+
+class LedgerEntry(models.Model):
+    """One movement of instructor money. Rows are only ever inserted.
+
+    Amounts are signed: sales credit, payouts and refunds debit. User.balance
+    is a rollup of these (see payment.ledger), never edited directly.
+    """
+    SALE = 'sale'
+    REFUND = 'refund'
+    PAYOUT = 'payout'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (SALE, 'Sale'),
+        (REFUND, 'Refund'),
+        (PAYOUT, 'Payout'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_entries')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # What caused the entry (checkout session, payout id, ...); unique per kind
+    # so a retried writer can't post the same movement twice.
+    reference = models.CharField(max_length=255, blank=True)
+    memo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'reference'], condition=~Q(reference=''), name='unique_ledger_reference',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['instructor', '-id'], name='ledger_instructor_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only; post an adjustment instead.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only; post an adjustment instead.")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.amount} for {self.instructor}"
+
+
+class LedgerRollup(models.Model):
+    # Single row: every entry with id <= last_entry_id is folded into User.balance
+    last_entry_id = models.BigIntegerField(default=0)
+    rolled_up_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,154 @@
+import time
+import uuid
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from app.models import User
+
+from .gateway import GatewayError, get_gateway
+from .ledger import available_balance, post_entries
+from .models import LedgerEntry, PayoutRequest
+
+# Seconds to wait between in-run retries of a retryable gateway error
+RETRY_DELAYS = (1, 2, 4)
+MAX_ATTEMPTS = 5
+
+
+class PayoutError(ValueError):
+    pass
+
+
+def request_payout(instructor, amount):
+    """Queue a payout and debit the ledger, or raise PayoutError.
+
+    The instructor's row is locked for the check-and-debit, so parallel
+    submissions wait for each other instead of overdrawing. Sales only
+    insert ledger rows and never take this lock.
+    """
+    if not amount.is_finite():
+        raise PayoutError("Enter a valid amount.")
+    if amount <= 0:
+        raise PayoutError("Amount must be greater than zero.")
+    with transaction.atomic():
+        User.objects.select_for_update().only('id').get(pk=instructor.pk)
+        if amount > available_balance(instructor):
+            raise PayoutError("Cannot request more than available balance.")
+        payout = PayoutRequest.objects.create(instructor=instructor, amount=amount)
+        LedgerEntry.objects.create(
+            instructor=instructor, kind=LedgerEntry.PAYOUT, amount=-amount,
+            reference=f'payout:{payout.id}', memo='Payout request',
+        )
+    return payout
+
+
+def process_payouts(batch_size=100, max_attempts=MAX_ATTEMPTS, gateway=None, sleep=time.sleep, progress=None):
+    """Pay every pending request, one transfer per instructor.
+
+    Each instructor's requests are claimed under a fresh batch key and that
+    claim is committed before the gateway is called. A crashed or retrying
+    run therefore leaves PROCESSING groups behind, which the next run resumes
+    with the same key, and the provider's idempotency makes a repeated
+    transfer a no-op. Returns a Counter of group outcomes.
+    """
+    gateway = gateway or get_gateway()
+    stats = Counter()
+
+    def settle(key):
+        stats[_settle(key, gateway, max_attempts, sleep)] += 1
+        if progress:
+            progress(stats)
+
+    resumed = PayoutRequest.objects.filter(status=PayoutRequest.PROCESSING).order_by()
+    for key in list(resumed.values_list('batch_key', flat=True).distinct()):
+        settle(key)
+
+    last_instructor = 0
+    while True:
+        instructor_ids = list(
+            PayoutRequest.objects.filter(status=PayoutRequest.PENDING, instructor_id__gt=last_instructor)
+            .order_by('instructor_id').values_list('instructor_id', flat=True).distinct()[:batch_size]
+        )
+        if not instructor_ids:
+            return stats
+        for instructor_id in instructor_ids:
+            key = _claim(instructor_id)
+            if key:
+                settle(key)
+        last_instructor = instructor_ids[-1]
+
+
+def _claim(instructor_id):
+    key = uuid.uuid4().hex
+    claimed = PayoutRequest.objects.filter(instructor_id=instructor_id, status=PayoutRequest.PENDING).update(
+        status=PayoutRequest.PROCESSING, batch_key=key,
+    )
+    return key if claimed else None
+
+
+def _settle(key, gateway, max_attempts, sleep):
+    group = PayoutRequest.objects.filter(batch_key=key, status=PayoutRequest.PROCESSING)
+    first = group.select_related('instructor').order_by('id').first()
+    if first is None:
+        return 'skipped'
+    destination = first.instructor.stripe_account_id
+    if not destination and not first.attempts:
+        # Nothing was ever sent for this group, so it can wait unclaimed
+        group.update(status=PayoutRequest.PENDING, batch_key='', last_error="No Stripe account connected.")
+        return 'skipped'
+
+    total = group.aggregate(total=Sum('amount'))['total']
+    ids = list(group.values_list('id', flat=True))
+    error = None
+    for delay in (0,) + RETRY_DELAYS:
+        if delay:
+            sleep(delay)
+        try:
+            transfer_id = gateway.transfer(
+                total, destination, idempotency_key=f'payout-{key}',
+                metadata={'instructor_id': first.instructor_id, 'payout_requests': ','.join(map(str, ids))},
+            )
+        except GatewayError as exc:
+            error = exc
+            if exc.retryable:
+                continue
+            break
+        group.update(
+            status=PayoutRequest.PAID, processed=True, processed_at=timezone.now(),
+            transfer_id=transfer_id, attempts=F('attempts') + 1, last_error='',
+        )
+        return 'paid'
+
+    group.update(attempts=F('attempts') + 1, last_error=str(error))
+    if error.retryable and first.attempts + 1 < max_attempts:
+        # Stays PROCESSING under the same key for the next run
+        return 'retrying'
+    _fail(PayoutRequest.objects.filter(batch_key=key, status=PayoutRequest.PROCESSING))
+    return 'failed'
+
+
+def approve_payouts(payouts):
+    """Release requests held for review to the next process_payouts run."""
+    return payouts.filter(status=PayoutRequest.REVIEW).update(status=PayoutRequest.PENDING)
+
+
+def reject_payouts(payouts):
+    """Fail requests held for review and refund them. Returns how many."""
+    return _fail(payouts.filter(status=PayoutRequest.REVIEW), memo='Payout rejected')
+
+
+def _fail(payouts, memo='Payout failed'):
+    # Give the money back to the instructor's balance
+    with transaction.atomic():
+        failed = list(payouts.select_for_update())
+        PayoutRequest.objects.filter(id__in=[payout.id for payout in failed]).update(status=PayoutRequest.FAILED)
+        post_entries([
+            LedgerEntry(
+                instructor_id=payout.instructor_id, kind=LedgerEntry.ADJUSTMENT, amount=payout.amount,
+                reference=f'payout-failed:{payout.id}', memo=memo,
+            )
+            for payout in failed
+        ])
+    return len(failed)
@@ -1,3 +1,259 @@
-from django.test import TestCase
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import stripe
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app.models import Course, Enrollment, User
+from tasks.models import Task
+from tasks.worker import claim, execute
+
+from .gateway import FakeGateway, GatewayError, get_gateway
+from .ledger import available_balance, reconcile, rollup_balances
+from .models import CheckoutFulfillment, LedgerEntry, PayoutRequest, StripeEvent
+from .payouts import PayoutError, approve_payouts, process_payouts, reject_payouts, request_payout
+
+WEBHOOK_SECRET = 'whsec_test'
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def stripe_signature(payload, secret=WEBHOOK_SECRET):
+    timestamp = int(time.time())
+    signature = stripe.WebhookSignature._compute_signature(f'{timestamp}.{payload}', secret)
+    return f't={timestamp},v1={signature}'
+
+
+def run_tasks():
+    while tasks := claim('test', 10):
+        for task in tasks:
+            execute(task)
+
+
+def sale(instructor, amount, reference):
+    return LedgerEntry.objects.create(
+        instructor=instructor, kind=LedgerEntry.SALE, amount=Decimal(amount), reference=reference,
+    )
+
+
+@override_settings(
+    STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, PAYMENT_GATEWAY='payment.gateway.FakeGateway', CACHES=LOCAL_CACHE,
+)
+class CheckoutTests(TestCase):
+    def setUp(self):
+        get_gateway.cache_clear()
+        self.addCleanup(get_gateway.cache_clear)
+        self.instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(
+            title='Paid', instructor=self.instructor, description='d', price=Decimal('25.00'),
+        )
+
+    def event(self, session_id, event_id='evt_1'):
+        return json.dumps({
+            'id': event_id, 'object': 'event', 'type': 'checkout.session.completed',
+            'data': {'object': {
+                'id': session_id, 'object': 'checkout.session', 'payment_status': 'paid', 'amount_total': 2500,
+                'metadata': {'course_id': str(self.course.id), 'student_id': str(self.student.id)},
+            }},
+        })
+
+    def post_webhook(self, payload, signature=None):
+        return self.client.post(
+            reverse('stripe_webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=signature or stripe_signature(payload),
+        )
+
+    def assert_sold_once(self):
+        self.assertEqual(CheckoutFulfillment.objects.count(), 1)
+        self.assertEqual(Enrollment.objects.filter(student=self.student, course=self.course).count(), 1)
+        self.assertEqual(available_balance(self.instructor), Decimal('25.00'))
+
+    def test_webhook_rejects_bad_signatures(self):
+        payload = self.event('cs_1')
+        self.assertEqual(self.post_webhook(payload, signature='t=1,v1=forged').status_code, 400)
+        self.assertEqual(self.post_webhook(payload, stripe_signature(payload, 'whsec_other')).status_code, 400)
+        self.assertEqual(self.post_webhook('not json', signature='t=1,v1=x').status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_webhook_queues_fulfillment(self):
+        self.assertEqual(self.post_webhook(self.event('cs_1')).status_code, 200)
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertEqual(Task.objects.get().name, 'payment.fulfillment.fulfill_session')
+        run_tasks()
+        self.assert_sold_once()
+
+    def test_webhook_redelivery_is_applied_once(self):
+        payload = self.event('cs_1')
+        self.assertEqual(self.post_webhook(payload).status_code, 200)
+        self.assertEqual(self.post_webhook(payload).status_code, 200)
+        run_tasks()
+        # A second event about the same session doesn't sell it twice either
+        self.assertEqual(self.post_webhook(self.event('cs_1', event_id='evt_2')).status_code, 200)
+        run_tasks()
+        self.assertEqual(StripeEvent.objects.count(), 2)
+        self.assert_sold_once()
+
+    def test_success_page_and_webhook_fulfill_once(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('buy_course', args=[self.course.id]))
+        session_id = response['Location'].split('session_id=')[1]
+
+        self.assertContains(self.client.get(response['Location']), 'Confirming your payment')
+        self.client.get(response['Location'])
+        self.assertEqual(Task.objects.count(), 1)  # reloads share the queued task
+        run_tasks()
+        self.assertContains(self.client.get(response['Location']), 'Payment Successful')
+        self.assertEqual(self.post_webhook(self.event(session_id)).status_code, 200)
+        run_tasks()
+        self.assert_sold_once()
+
+    def test_success_page_ignores_someone_elses_session(self):
+        other = User.objects.create_user('other', password='pw')
+        self.client.force_login(self.student)
+        location = self.client.get(reverse('buy_course', args=[self.course.id]))['Location']
+        self.client.force_login(other)
+        self.client.get(location)
+        run_tasks()
+        self.assertFalse(CheckoutFulfillment.objects.exists())
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class AboutPageTests(TestCase):
+    def test_course_filters_apply_to_counts_and_cards(self):
+        instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+        for title, course_type, is_free in (
+            ('Free advanced', 'ADVANCED', True), ('Paid advanced', 'ADVANCED', False), ('Paid beginner', 'BEGINNER', False),
+        ):
+            Course.objects.create(
+                title=title, instructor=instructor, description='d', course_type=course_type, is_free=is_free,
+            )
+
+        response = self.client.get(reverse('about'), {'course_type': 'ADVANCED', 'is_free': '0'})
+        [listed] = response.context['page_obj'].object_list
+        self.assertEqual(listed.course_count, 1)
+        self.assertEqual([course.title for course in listed.top_courses], ['Paid advanced'])
+
+        response = self.client.get(reverse('about'), {'is_free': 'x'})
+        self.assertEqual(response.context['page_obj'].object_list[0].course_count, 3)
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user('teacher', password='pw', is_instructor=True)
+
+    def test_rollup_folds_settled_entries_without_changing_the_balance(self):
+        sale(self.instructor, '10.00', 'cs_1')
+        sale(self.instructor, '5.50', 'cs_2')
+        self.assertEqual(available_balance(self.instructor), Decimal('15.50'))
+
+        self.assertEqual(rollup_balances(), 0)  # still inside the grace period
+        self.assertEqual(rollup_balances(grace=timedelta(0)), 2)
+        self.assertEqual(rollup_balances(grace=timedelta(0)), 0)
+        self.instructor.refresh_from_db()
+        self.assertEqual(self.instructor.balance, Decimal('15.50'))
+        self.assertEqual(available_balance(self.instructor), Decimal('15.50'))
+
+    def test_entries_are_append_only_and_unique_per_reference(self):
+        entry = sale(self.instructor, '10.00', 'cs_1')
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            sale(self.instructor, '10.00', 'cs_1')
+
+    def test_reconcile_finds_and_fixes_drift(self):
+        sale(self.instructor, '10.00', 'cs_1')
+        rollup_balances(grace=timedelta(0))
+        User.objects.filter(pk=self.instructor.pk).update(balance=Decimal('99.00'))
+
+        self.assertEqual(reconcile(), [(self.instructor.id, Decimal('99.00'), Decimal('10.00'))])
+        reconcile(fix=True)
+        self.assertEqual(reconcile(), [])
+
+
+class FlakyGateway(FakeGateway):
+    def __init__(self, *errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def transfer(self, amount, destination, idempotency_key, metadata=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().transfer(amount, destination, idempotency_key, metadata)
+
+
+class PayoutTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            'teacher', password='pw', is_instructor=True, stripe_account_id='acct_1',
+        )
+        sale(self.instructor, '100.00', 'cs_1')
+
+    def test_request_debits_the_ledger(self):
+        request_payout(self.instructor, Decimal('30.00'))
+        self.assertEqual(available_balance(self.instructor), Decimal('70.00'))
+        with self.assertRaises(PayoutError):
+            request_payout(self.instructor, Decimal('70.01'))
+        with self.assertRaises(PayoutError):
+            request_payout(self.instructor, Decimal('0'))
+
+    def test_non_numeric_amounts_are_form_errors(self):
+        self.client.force_login(self.instructor)
+        for amount in ('NaN', 'sNaN', 'Infinity', '-Infinity', 'abc', ''):
+            response = self.client.post(reverse('payout_request'), {'amount': amount}, follow=True)
+            self.assertContains(response, 'Enter a valid amount.')
+        self.assertFalse(PayoutRequest.objects.exists())
+
+    def test_one_transfer_per_instructor_and_no_double_pay(self):
+        request_payout(self.instructor, Decimal('30.00'))
+        request_payout(self.instructor, Decimal('20.00'))
+        gateway = FakeGateway()
+
+        self.assertEqual(process_payouts(gateway=gateway)['paid'], 1)
+        self.assertEqual(process_payouts(gateway=gateway)['paid'], 0)
+        [transfer] = gateway.transfers.values()
+        self.assertEqual((transfer['amount'], transfer['destination']), (Decimal('50.00'), 'acct_1'))
+        self.assertEqual(PayoutRequest.objects.filter(status=PayoutRequest.PAID).count(), 2)
+
+    def test_retryable_error_resumes_with_the_same_key(self):
+        request_payout(self.instructor, Decimal('30.00'))
+        gateway = FlakyGateway(*[GatewayError("timeout", retryable=True)] * 4)
+
+        self.assertEqual(process_payouts(gateway=gateway, sleep=lambda seconds: None)['retrying'], 1)
+        key = PayoutRequest.objects.get().batch_key
+        self.assertEqual(process_payouts(gateway=gateway, sleep=lambda seconds: None)['paid'], 1)
+        self.assertEqual(list(gateway.transfers), [f'payout-{key}'])
+
+    def test_permanent_error_fails_and_refunds(self):
+        request_payout(self.instructor, Decimal('30.00'))
+        gateway = FlakyGateway(GatewayError("account closed"))
+
+        self.assertEqual(process_payouts(gateway=gateway)['failed'], 1)
+        self.assertEqual(PayoutRequest.objects.get().status, PayoutRequest.FAILED)
+        self.assertEqual(available_balance(self.instructor), Decimal('100.00'))
+
+    def test_instructor_without_stripe_account_waits(self):
+        User.objects.filter(pk=self.instructor.pk).update(stripe_account_id=None)
+        request_payout(self.instructor, Decimal('30.00'))
+        self.assertEqual(process_payouts(gateway=FakeGateway())['skipped'], 1)
+        self.assertEqual(PayoutRequest.objects.get().status, PayoutRequest.PENDING)
+
+    def test_payouts_needing_review_wait_for_an_admin(self):
+        approved = PayoutRequest.objects.create(instructor=self.instructor, amount=Decimal('10.00'))
+        rejected = PayoutRequest.objects.create(instructor=self.instructor, amount=Decimal('15.00'))
+        PayoutRequest.objects.update(status=PayoutRequest.REVIEW)
+        self.assertEqual(process_payouts(gateway=FakeGateway()), {})
+
+        self.assertEqual(approve_payouts(PayoutRequest.objects.filter(pk=approved.pk)), 1)
+        self.assertEqual(reject_payouts(PayoutRequest.objects.all()), 1)
+        self.assertEqual(reject_payouts(PayoutRequest.objects.all()), 0)
+        self.assertEqual(process_payouts(gateway=FakeGateway())['paid'], 1)
+        rejected.refresh_from_db()
+        self.assertEqual(rejected.status, PayoutRequest.FAILED)
+        self.assertEqual(available_balance(self.instructor), Decimal('115.00'))
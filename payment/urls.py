@@ -4,6 +4,7 @@ from payment import views
 urlpatterns = [
     path('buy/<int:course_id>/', views.buy_course, name='buy_course'),
     path('payment-success/<int:course_id>/', views.payment_success, name='payment_success'),
+    path('stripe/webhook/', views.stripe_webhook, name='stripe_webhook'),
     path('instructor/payout-request/', views.payout_request_view, name='payout_request'),
     path('all_courses',views.all_courses,name="all_courses"),
     path('about',views.about,name="about"),
@@ -1,55 +1,75 @@
 import stripe
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.shortcuts import redirect, get_object_or_404, render
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.shortcuts import aget_object_or_404, redirect, get_object_or_404, render
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from app.models import Course, Enrollment
+from .checkout import get_checkout_url
+from .fulfillment import confirm_checkout, handle_event
+from .models import CheckoutFulfillment
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
-def buy_course(request, course_id):
-    course = get_object_or_404(Course, id=course_id)
+@login_required
+async def buy_course(request, course_id):
+    course = await aget_object_or_404(Course, id=course_id)
+    user = await request.auser()
 
     # If already enrolled
-    if Enrollment.objects.filter(student=request.user, course=course).exists():
+    if await Enrollment.objects.filter(student=user, course=course).aexists():
         return redirect('classroom_view', course_id=course.id)
 
     # Free course - auto enroll
     if course.is_free or course.price == 0:
-        Enrollment.objects.create(student=request.user, course=course)
+        await Enrollment.objects.acreate(student=user, course=course)
         return redirect('classroom_view', course_id=course.id)
 
-    # Stripe Checkout
-    checkout_session = stripe.checkout.Session.create(
-        payment_method_types=['card'],
-        line_items=[{
-            'price_data': {
-                'currency': 'usd',
-                'unit_amount': int(course.price * 100),
-                'product_data': {
-                    'name': course.title,
-                },
-            },
-            'quantity': 1,
-        }],
-        mode='payment',
-        success_url=request.build_absolute_uri(f'/payment-success/{course.id}/'),
+    # Stripe Checkout, reusing this user's open session for the course. The
+    # HTTP call runs on a worker thread so it never blocks the event loop.
+    checkout_url = await sync_to_async(get_checkout_url, thread_sensitive=False)(
+        user,
+        course,
+        success_url=request.build_absolute_uri(
+            reverse('payment_success', args=[course.id])
+        ) + '?session_id={CHECKOUT_SESSION_ID}',
         cancel_url=request.build_absolute_uri(f'/course/{course.id}/'),
-        customer_email=request.user.email
     )
 
-    return redirect(checkout_session.url)
+    return redirect(checkout_url)
 
 def payment_success(request, course_id):
     course = get_object_or_404(Course, id=course_id)
 
-    # Enroll student
-    Enrollment.objects.get_or_create(student=request.user, course=course)
-
-    # Add course price to instructor balance
-    instructor = course.instructor
-    instructor.balance += course.price
-    instructor.save()
+    # The webhook normally fulfills first. If it hasn't yet, have the worker
+    # confirm the session with Stripe; the page shows "confirming" until the
+    # enrollment exists, and reloads share the one queued task.
+    session_id = request.GET.get('session_id')
+    if (
+        session_id and request.user.is_authenticated
+        and not CheckoutFulfillment.objects.filter(session_id=session_id).exists()
+    ):
+        confirm_checkout.enqueue(session_id, course.id, request.user.id, key=f'confirm_checkout:{session_id}')
+
+    enrolled = Enrollment.objects.filter(student=request.user, course=course).exists()
+    return render(request, 'payment_success.html', {'course': course, 'enrolled': enrolled})
+
+
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    try:
+        event = stripe.Webhook.construct_event(
+            request.body,
+            request.META.get('HTTP_STRIPE_SIGNATURE', ''),
+            settings.STRIPE_WEBHOOK_SECRET,
+        )
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponseBadRequest()
 
-    return render(request, 'payment_success.html', {'course': course})
+    handle_event(event)
+    return HttpResponse(status=200)
 
 
 
@@ -57,60 +77,62 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import PayoutRequest
+from .ledger import available_balance
+from .payouts import PayoutError, request_payout
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+
+EARNINGS_HISTORY = 20
 
 @login_required
 def payout_request_view(request):
     instructor = request.user
 
     if request.method == "POST":
-        amount = Decimal(request.POST.get('amount'))  # convert POST value to Decimal
         try:
-           amount = Decimal(request.POST.get('amount'))  # convert POST value to Decimal
-        except (ValueError, TypeError):
+            amount = Decimal(request.POST.get('amount'))  # convert POST value to Decimal
+        except (InvalidOperation, ValueError, TypeError):
             messages.error(request, "Enter a valid amount.")
             return redirect('payout_request')
 
-        if amount <= 0:
-            messages.error(request, "Amount must be greater than zero.")
-        elif amount > instructor.balance:
-            messages.error(request, "Cannot request more than available balance.")
+        try:
+            request_payout(instructor, amount)
+        except PayoutError as exc:
+            messages.error(request, str(exc))
         else:
-            PayoutRequest.objects.create(instructor=instructor, amount=amount)
-            instructor.balance -= amount
-            instructor.save()
             messages.success(request, "Payout request submitted successfully!")
 
         return redirect('payout_request')
 
     # Show payout requests history
     requests = PayoutRequest.objects.filter(instructor=instructor).order_by('-requested_at')
+    entries = instructor.ledger_entries.order_by('-id')[:EARNINGS_HISTORY]
 
     return render(request, "instructor/payout_request.html", {
-        "balance": instructor.balance,
+        "balance": available_balance(instructor),
         "requests": requests,
+        "entries": entries,
     })
 
 
 
-from django.core.paginator import Paginator
 from django.db.models import Q
 from app.models import User
-
-def all_courses(request):
-    courses = Course.objects.all()
-
-    # Search
+from app.pagination import KeysetPaginator, paginate_sequence
+from app.search import search_courses
+from app.shortcuts import arender
+from Lms.routers import replica_reads
+
+@replica_reads
+async def all_courses(request):
+    courses = Course.objects.for_card()
     query = request.GET.get('q')
-    if query:
-        courses = courses.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__icontains=query)
-        )
 
     # Filters
+    instructor = request.GET.get('instructor')
+    if instructor and instructor.isdigit():
+        courses = courses.filter(instructor_id=instructor)
+
     course_type = request.GET.get('course_type')
     if course_type:
         courses = courses.filter(course_type=course_type)
@@ -121,23 +143,33 @@ def all_courses(request):
     elif is_free == '0':
         courses = courses.filter(is_free=False)
 
-    # Pagination
-    paginator = Paginator(courses, 9)  # 9 courses per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination: 9 courses per page, by cursor so deep pages stay cheap.
+    # Search returns a bounded, ranked list from the full-text index.
+    cursor = request.GET.get('cursor')
+    if query:
+        # The search backends run raw SQL through a sync cursor
+        results = await sync_to_async(search_courses)(query, courses)
+        page_obj = paginate_sequence(results, 9, cursor)
+    else:
+        page_obj = await KeysetPaginator(courses, 9, with_total=True).aget_page(cursor)
 
-    return render(request, 'all_courses.html', {
+    return await arender(request, 'all_courses.html', {
         'page_obj': page_obj,
         'query': query,
         'course_type': course_type,
         'is_free': is_free,
+        'instructor': instructor,
     })
 
 from django.shortcuts import render
-from django.db.models import Q, Prefetch
-from django.core.paginator import Paginator
+from django.db.models import Count, Prefetch, Q, prefetch_related_objects
 from app.models import User, Course
 
+INSTRUCTORS_PER_PAGE = 12
+COURSES_PER_INSTRUCTOR = 6
+
+
+@replica_reads
 def about(request):
     # Search instructors
     query = request.GET.get('q', '')
@@ -148,35 +180,34 @@ def about(request):
             Q(email__icontains=query)
         )
 
-    # Filters for courses
+    # Filters for courses, applied to Course and, prefixed, from the User side
     course_type = request.GET.get('course_type', '')
     is_free = request.GET.get('is_free', '')
 
-    course_filter = Q()
+    course_filter = {}
     if course_type:
-        course_filter &= Q(course_type=course_type)
-    if is_free == '1':
-        course_filter &= Q(is_free=True)
-    elif is_free == '0':
-        course_filter &= Q(is_free=False)
-
-    instructors = instructors.prefetch_related(
-        Prefetch('course_set', queryset=Course.objects.filter(course_filter).order_by('-created_at'))
+        course_filter['course_type'] = course_type
+    if is_free in ('1', '0'):
+        course_filter['is_free'] = is_free == '1'
+    count_filter = Q(**{f'course__{key}': value for key, value in course_filter.items()})
+
+    instructors = instructors.annotate(course_count=Count('course', filter=count_filter))
+    paginator = KeysetPaginator(instructors, INSTRUCTORS_PER_PAGE, ordering=('-date_joined', '-id'))
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    # Only the newest few courses per instructor on this page. Django turns
+    # the sliced Prefetch into a ROW_NUMBER() window, so it's one query.
+    top_courses = Course.objects.for_listing().filter(**course_filter)[:COURSES_PER_INSTRUCTOR]
+    prefetch_related_objects(
+        page_obj.object_list,
+        Prefetch('course_set', queryset=top_courses, to_attr='top_courses'),
     )
 
-    # Pagination per instructor: 6 courses per page
-    instructor_courses_pages = {}
-    for instructor in instructors:
-        paginator = Paginator(list(instructor.course_set.all()), 6)
-        page_number = request.GET.get(f'page_{instructor.id}', 1)
-        instructor_courses_pages[instructor.id] = paginator.get_page(page_number)
-
     return render(request, 'about.html', {
-        'instructors': instructors,
+        'page_obj': page_obj,
         'query': query,
         'course_type': course_type,
         'is_free': is_free,
-        'instructor_courses_pages': instructor_courses_pages
     })
 
 
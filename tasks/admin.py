@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    ordering = ('-id',)
+    actions = ['retry']
+
+    @admin.action(description="Queue selected tasks again")
+    def retry(self, request, queryset):
+        queued = queryset.filter(status=Task.FAILED).update(
+            status=Task.QUEUED, attempts=0, run_at=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f"Queued {queued} task(s) again.")
@@ -0,0 +1,28 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks from the database. Stop with Ctrl-C or SIGTERM."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Tasks to run at once.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+
+        def shutdown(signum, frame):
+            self.stdout.write("Finishing running tasks, then exiting...")
+            worker.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(f"Worker {worker.worker_id} started with {worker.concurrency} thread(s).")
+        stats = worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f"Stopped. {stats['done']} done, {stats['failed']} failed."))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='task',
+            name='unique_pending_task_key',
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(('key', ''), _negated=True), ('status', 'queued')), fields=('key',), name='unique_queued_task_key'),
+        ),
+    ]
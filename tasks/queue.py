@@ -0,0 +1,61 @@
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+REGISTRY = {}
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def task(func=None, *, max_attempts=5):
+    """Register ``func`` as runnable by the worker and give it ``.enqueue()``.
+
+    The function stays directly callable. Arguments must be JSON-serializable,
+    so pass ids rather than model instances.
+    """
+    def decorator(func):
+        REGISTRY[task_name(func)] = func
+
+        @wraps(func)
+        def enqueue_func(*args, **kwargs):
+            kwargs.setdefault('max_attempts', max_attempts)
+            return enqueue(func, *args, **kwargs)
+
+        func.enqueue = enqueue_func
+        return func
+
+    return decorator(func) if func else decorator
+
+
+def enqueue(func, *args, key='', run_at=None, max_attempts=5, **kwargs):
+    """Queue ``func(*args, **kwargs)`` for the worker and return the Task.
+
+    The row is written in the caller's transaction, so the task only becomes
+    visible if that commits. With a ``key``, enqueueing while an equal task
+    is still queued returns the existing task instead; one that is already
+    running doesn't count, so the new call still gets its own run.
+    """
+    fields = {
+        'name': task_name(func),
+        'args': list(args),
+        'kwargs': kwargs,
+        'key': key,
+        'run_at': run_at or timezone.now(),
+        'max_attempts': max_attempts,
+    }
+    if not key:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(**fields)
+    except IntegrityError:
+        existing = Task.objects.filter(key=key, status=Task.QUEUED).first()
+        if existing is None:
+            # It was claimed between our insert and this lookup; queue it again
+            return Task.objects.create(**fields)
+        return existing
@@ -0,0 +1,126 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Task
+from .queue import task
+from .worker import Worker, claim, execute, heartbeat, requeue_stale
+
+CALLS = []
+
+
+@task(max_attempts=2)
+def record(value):
+    CALLS.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+class EnqueueTests(TestCase):
+    def test_key_merges_with_a_queued_task(self):
+        first = record.enqueue(1, key='k')
+        self.assertEqual(record.enqueue(2, key='k').pk, first.pk)
+
+    def test_key_does_not_merge_with_a_running_task(self):
+        first = record.enqueue(1, key='k')
+        claim('w', 1)
+        follow_up = record.enqueue(2, key='k')
+        self.assertNotEqual(follow_up.pk, first.pk)
+        self.assertEqual(follow_up.status, Task.QUEUED)
+
+
+class ExecuteTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_success(self):
+        record.enqueue(1)
+        self.assertTrue(execute(claim('w', 1)[0]))
+        self.assertEqual(CALLS, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_failure_retries_then_fails(self):
+        explode.enqueue()
+        self.assertFalse(execute(claim('w', 1)[0]))
+        failed = Task.objects.get()
+        self.assertEqual((failed.status, failed.attempts), (Task.QUEUED, 1))
+        self.assertIn('RuntimeError', failed.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        execute(claim('w', 1)[0])
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.attempts), (Task.FAILED, 2))
+
+    def test_failed_retry_gives_way_to_a_queued_twin(self):
+        explode.enqueue(key='k')
+        running = claim('w', 1)[0]
+        twin = explode.enqueue(key='k')
+        self.assertFalse(execute(running))
+        running.refresh_from_db()
+        self.assertEqual(running.status, Task.FAILED)
+        self.assertIn('same key', running.last_error)
+        self.assertEqual(Task.objects.get(pk=twin.pk).status, Task.QUEUED)
+
+
+class StaleTaskTests(TestCase):
+    def test_stale_task_counts_an_attempt_and_eventually_fails(self):
+        record.enqueue(1)
+        for expected in (Task.QUEUED, Task.FAILED):
+            Task.objects.update(run_at=timezone.now())
+            claim('w', 1)
+            Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+            requeue_stale()
+            self.assertEqual(Task.objects.get().status, expected)
+        self.assertEqual(Task.objects.get().attempts, 2)
+
+    def test_heartbeat_keeps_a_long_task_running(self):
+        record.enqueue(1)
+        record.enqueue(2)
+        mine, theirs = claim('w', 1)[0], claim('other', 1)[0]
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(heartbeat('w'), 1)
+        requeue_stale()
+        self.assertEqual(Task.objects.get(pk=mine.pk).status, Task.RUNNING)
+        self.assertEqual(Task.objects.get(pk=theirs.pk).status, Task.QUEUED)
+
+    def test_old_claim_cannot_overwrite_a_new_one(self):
+        record.enqueue(1)
+        old = claim('w', 1)[0]
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        requeue_stale()
+        Task.objects.update(run_at=timezone.now())
+        new = claim('w2', 1)[0]
+        execute(old)
+        self.assertEqual(Task.objects.get().status, Task.RUNNING)
+        execute(new)
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+
+class WorkerTests(TestCase):
+    def test_poll_errors_do_not_stop_the_worker(self):
+        with mock.patch('tasks.worker.claim', side_effect=[DatabaseError("gone"), []]) as claim_mock, \
+                self.assertLogs('tasks.worker', 'ERROR'):
+            stats = Worker(concurrency=1, poll_interval=0).run(burst=True)
+        self.assertEqual(stats, {'done': 0, 'failed': 0})
+        self.assertEqual(claim_mock.call_count, 1)
+
+    def test_heartbeats_while_running(self):
+        beaten = threading.Event()
+
+        def slow_poll(worker_id, limit):
+            # Hold the poll loop until the heartbeat thread has fired once
+            self.assertTrue(beaten.wait(5))
+            return []
+
+        worker = Worker(concurrency=1, poll_interval=0, heartbeat_every=timedelta(milliseconds=10))
+        with mock.patch('tasks.worker.claim', side_effect=slow_poll), \
+                mock.patch('tasks.worker.heartbeat', side_effect=lambda worker_id: beaten.set()) as beat:
+            worker.run(burst=True)
+        beat.assert_called_with(worker.worker_id)
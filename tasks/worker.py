@@ -0,0 +1,209 @@
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+from .queue import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 5
+BACKOFF_MAX = 60 * 60
+# A RUNNING task whose worker went quiet this long is assumed dead and requeued
+STALE_AFTER = timedelta(minutes=30)
+# How often a live worker vouches for the tasks it's running
+HEARTBEAT_EVERY = timedelta(minutes=1)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: ~5s, 10s, 20s, ... capped at an hour."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def resolve(name):
+    if name not in REGISTRY:
+        # Importing the module runs its @task decorators
+        import_string(name)
+    if name not in REGISTRY:
+        raise LookupError(f"{name} is not a registered task.")
+    return REGISTRY[name]
+
+
+def claim(worker_id, limit):
+    """Atomically take up to ``limit`` due tasks for this worker.
+
+    Postgres skips rows other workers have locked, so concurrent claims never
+    wait on each other. SQLite has no row locks but serializes writers, and
+    the conditional UPDATE below means a row is only ever claimed once.
+    """
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    now = timezone.now()
+    with transaction.atomic():
+        due = Task.objects.filter(status=Task.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        Task.objects.filter(id__in=ids, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=token, locked_at=now,
+        )
+    return list(Task.objects.filter(locked_by=token, status=Task.RUNNING).order_by('run_at', 'id'))
+
+
+def _held(task):
+    # Only the claim that is still current may record an outcome, so a task
+    # requeued as stale and claimed again isn't overwritten by its old run.
+    return Task.objects.filter(pk=task.pk, status=Task.RUNNING, locked_by=task.locked_by)
+
+
+def retry_or_fail(task, attempts, error):
+    """Queue ``task`` again after a failed attempt, or mark it FAILED once
+    it's out of attempts. Returns True if it was queued again."""
+    if attempts < task.max_attempts:
+        try:
+            with transaction.atomic():
+                return bool(_held(task).update(
+                    status=Task.QUEUED, run_at=timezone.now() + retry_delay(attempts),
+                    attempts=attempts, last_error=error, locked_by='',
+                ))
+        except IntegrityError:
+            # An equal task was queued while this one ran and covers its work
+            error += "\nNot retried: a queued task with the same key replaces it."
+    _held(task).update(
+        status=Task.FAILED, finished_at=timezone.now(), attempts=attempts, last_error=error, locked_by='',
+    )
+    return False
+
+
+def execute(task):
+    """Run one claimed task and record the outcome. Returns True on success."""
+    close_old_connections()
+    attempts = task.attempts + 1
+    try:
+        resolve(task.name)(*task.args, **task.kwargs)
+    except Exception:
+        logger.warning("Task %s (%s) failed on attempt %s", task.pk, task.name, attempts)
+        retry_or_fail(task, attempts, traceback.format_exc())
+        return False
+    else:
+        _held(task).update(
+            status=Task.DONE, attempts=attempts, finished_at=timezone.now(), locked_by='', last_error='',
+        )
+        return True
+    finally:
+        connection.close()
+
+
+def heartbeat(worker_id):
+    """Refresh locked_at on the tasks ``worker_id`` is running, so a long
+    task isn't mistaken for a dead one. Returns the number touched."""
+    return Task.objects.filter(status=Task.RUNNING, locked_by__startswith=f'{worker_id}:').update(
+        locked_at=timezone.now(),
+    )
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """Put RUNNING tasks back in the queue if their worker died mid-task,
+    which shows as no heartbeat for ``stale_after``.
+
+    That counts as a failed attempt, so a task that keeps killing its worker
+    ends up FAILED instead of looping. Returns the number requeued.
+    """
+    cutoff = timezone.now() - stale_after
+    requeued = 0
+    for task in Task.objects.filter(status=Task.RUNNING, locked_at__lt=cutoff):
+        error = f"Worker {task.locked_by} stopped responding during attempt {task.attempts + 1}."
+        requeued += retry_or_fail(task, task.attempts + 1, error)
+    return requeued
+
+
+class Worker:
+    """Polls the Task table and runs claimed tasks on a thread pool."""
+
+    def __init__(self, concurrency=4, poll_interval=1.0, stale_after=STALE_AFTER, heartbeat_every=HEARTBEAT_EVERY):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.heartbeat_every = min(heartbeat_every, stale_after / 3)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.stats = {'done': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self, burst=False):
+        """Work until stop() is called, or until the queue is empty if ``burst``."""
+        finished = threading.Event()
+        beat = threading.Thread(target=self._beat, args=(finished,), name='task-heartbeat', daemon=True)
+        beat.start()
+        try:
+            self._work(burst)
+        finally:
+            finished.set()
+            beat.join()
+        return self.stats
+
+    def _work(self, burst):
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='task') as pool:
+            last_stale_check = None
+            while not self.stopping.is_set():
+                # Like a request boundary: drop connections that broke or aged out
+                close_old_connections()
+                tasks = []
+                try:
+                    now = timezone.now()
+                    if last_stale_check is None or now - last_stale_check > self.stale_after / 10:
+                        requeue_stale(self.stale_after)
+                        last_stale_check = now
+
+                    in_flight = {future for future in in_flight if not future.done()}
+                    free = self.concurrency - len(in_flight)
+                    tasks = claim(self.worker_id, free) if free else []
+                except Exception:
+                    # A database hiccup shouldn't take the worker down; retry next poll
+                    logger.exception("Worker %s failed to poll for tasks", self.worker_id)
+                    connection.close()
+                for task in tasks:
+                    future = pool.submit(execute, task)
+                    future.add_done_callback(self._record)
+                    in_flight.add(future)
+
+                if burst and not tasks and not in_flight:
+                    break
+                if not tasks:
+                    self.stopping.wait(self.poll_interval)
+            # Leaving the with block waits for in-flight tasks to finish
+
+    def _beat(self, finished):
+        # Keeps going until the last in-flight task is done, not just until stop()
+        while not finished.wait(self.heartbeat_every.total_seconds()):
+            try:
+                heartbeat(self.worker_id)
+            except Exception:
+                logger.exception("Worker %s failed to send a heartbeat", self.worker_id)
+            finally:
+                connection.close()
+
+    def _record(self, future):
+        error = future.exception()
+        if error is not None:
+            # Recording the outcome failed; the task stays RUNNING until
+            # requeue_stale picks it up.
+            logger.error("Worker %s lost a task's outcome", self.worker_id, exc_info=error)
+        with self._lock:
+            self.stats['done' if error is None and future.result() else 'failed'] += 1